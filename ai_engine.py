@@ -4,12 +4,18 @@ from config import (
     UPGRADE_COST_TIER_2, UPGRADE_COST_TIER_3, 
     FORTRESS_TYPES, TERRAIN_BUILD_OPTIONS
 )
+import fortress_engine
+import routing_engine
+from persistence_engine import mark_dirty
 
 def process_ai_turn(game_state):
     profile = AI_PROFILES.get(AI_DIFFICULTY, AI_PROFILES["Normal"])
     expand_bias = profile["expand_bias"]
+    rng = game_state.get("rng", random)
     
-    ai_forts = [f for f in game_state["fortresses"].values() if f['owner'] == "Gorgon"]
+    # Sorted so random draws happen in the same order on replay, whatever the set order
+    fortresses = game_state["fortresses"]
+    ai_forts = [fortresses.materialize(fid) for fid in sorted(fortress_engine.get_owned_fortress_ids(game_state, "Gorgon"), key=int)]
     
     for fort in ai_forts:
         if fort.get('disabled', False):
@@ -22,7 +28,8 @@ def process_ai_turn(game_state):
             special_options = [t for t in allowed_types if t != "Keep"]
             
             if special_options:
-                fort['type'] = random.choice(special_options)
+                fort['type'] = rng.choice(special_options)
+                mark_dirty(game_state, "fortresses", fort['id'])
                 continue
 
         # --- B. UPGRADES ---
@@ -30,19 +37,25 @@ def process_ai_turn(game_state):
         if current_tier < 3:
             cost = UPGRADE_COST_TIER_2 if current_tier == 1 else UPGRADE_COST_TIER_3
             if fort['units'] > cost + 25:
-                if random.random() < 0.15:
+                if rng.random() < 0.15:
                     fort['units'] -= cost
                     fort['tier'] += 1
+                    mark_dirty(game_state, "fortresses", fort['id'])
                     continue
 
         # --- C. PATH DECOMMISSIONING ---
-        # If target is now owned by Gorgon, remove it from paths
+        # If target (or the end of a routed path) is now owned by Gorgon, remove it from paths
+        routes = fort.setdefault('routes', {})
         paths_to_keep = []
         for target_id in fort['paths']:
-            target = game_state["fortresses"].get(str(target_id))
-            if target and target['owner'] != "Gorgon":
+            target_key = str(routes.get(target_id, target_id))
+            if game_state["fortresses"].has(target_key) and game_state["fortresses"].owner(target_key) != "Gorgon":
                 paths_to_keep.append(target_id)
-        fort['paths'] = paths_to_keep
+            else:
+                routes.pop(target_id, None)
+        if len(paths_to_keep) != len(fort['paths']):
+            fort['paths'] = paths_to_keep
+            mark_dirty(game_state, "fortresses", fort['id'])
 
         # --- D. ATTACK / EXPANSION ---
         if fort['units'] > 20:
@@ -51,8 +64,11 @@ def process_ai_turn(game_state):
             lowest_defense = 999
             
             for n_id in neighbors:
-                target = game_state["fortresses"].get(str(n_id))
-                if not target or target['owner'] == "Gorgon":
+                # peek: sizing up a neighbour does not store it
+                if not game_state["fortresses"].has(str(n_id)):
+                    continue
+                target = game_state["fortresses"].peek(str(n_id))
+                if target['owner'] == "Gorgon":
                     continue
                 
                 if target['units'] < lowest_defense:
@@ -64,4 +80,10 @@ def process_ai_turn(game_state):
                 if fort['units'] > aggression_threshold:
                     tid = str(weakest_target['id'])
                     if tid not in fort['paths'] and len(fort['paths']) < fort['tier']:
-                        fort['paths'].append(tid)
\ No newline at end of file
+                        fort['paths'].append(tid)
+                        mark_dirty(game_state, "fortresses", fort['id'])
+            elif not fort['paths']:
+                # Interior fort: push reserves along a multi-hop route to the nearest frontier
+                frontier_id = routing_engine.nearest_target(game_state, fort['id'], "Gorgon")
+                if frontier_id is not None and routing_engine.add_route(game_state, fort, frontier_id):
+                    mark_dirty(game_state, "fortresses", fort['id'])
\ No newline at end of file
@@ -1,42 +1,55 @@
+import async_engine
+async_engine.monkey_patch()  # Before Flask, pymongo or threading are imported
+
 import os
 import random
 import time
 import json
 from threading import RLock
-from flask import Flask, jsonify, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for, flash
 from flask_pymongo import PyMongo
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
 from flask_bcrypt import Bcrypt
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO
 from bson.objectid import ObjectId
 
 # --- Import New Engines ---
-import world_engine
+import auth_engine
+import cluster_engine
+import wire_engine
 import fortress_engine
 import combat_engine
-from ai_engine import process_ai_turn
+import simulation_engine
+import persistence_engine
+import event_log
 
 from config import (
     RACES, MAX_PLAYERS, STARTING_UNITS_POOL, TICK_RATE, 
-    TERRAIN_BUILD_OPTIONS, FORTRESS_TYPES
+    TERRAIN_BUILD_OPTIONS, FORTRESS_TYPES, PERSISTENCE_ENABLED, EVENT_LOG_ENABLED,
+    SOCKETIO_ASYNC_MODE, SERVER_ROLE, SOCKETIO_MESSAGE_QUEUE, SERVER_PORT,
+    WIRE_COMPRESSION, WIRE_COMPRESSION_THRESHOLD
 )
 
 # --- Configuration Overrides ---
 RACES["Human"]["color"] = 0xff0000
 RACES["Orc"]["color"] = 0x00ff00
 
-AI_NAME = "Gorgon"
-
 # --- Setup ---
 mongo = PyMongo()
 bcrypt = Bcrypt()
-socketio = SocketIO(async_mode='threading', cors_allowed_origins="*")
+socketio = SocketIO(
+    async_mode=SOCKETIO_ASYNC_MODE, cors_allowed_origins="*", message_queue=SOCKETIO_MESSAGE_QUEUE,
+    http_compression=WIRE_COMPRESSION, compression_threshold=WIRE_COMPRESSION_THRESHOLD
+)
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
+user_cache = auth_engine.UserCache()
 
 thread = None
 thread_lock = RLock()
+match_log = event_log.EventLog()
+command_queue = None  # cluster_engine.CommandQueue outside standalone mode
 
 # --- Global Game State ---
 game_state = {
@@ -47,9 +60,11 @@ game_state = {
     "face_terrain": [],
     "adj": {},
     "roads": [],
-    "fortresses": {},
+    "fortresses": fortress_engine.FortressMap(),
     "sector_owners": {},
-    "dominance_cache": {}
+    "dominance_cache": {},
+    "route_cache": {},
+    "owner_index": {}
 }
 
 # --- User Class ---
@@ -69,18 +84,131 @@ class User(UserMixin):
         return self.user_doc.get("password_hash")
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return auth_engine.run_bcrypt(bcrypt.check_password_hash, self.password_hash, password)
 
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        user_doc = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+        user_doc = user_cache.get(user_id)
+        if user_doc is None:
+            user_doc = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+            if user_doc:
+                user_cache.put(user_id, user_doc)
         if user_doc:
             return User(user_doc)
     except Exception as e:
         print(f"DEBUG: Error loading user: {e}")
     return None
 
+def start_match():
+    """Generates a fresh world and opens its event log."""
+    seed = simulation_engine.new_match(game_state)
+    if EVENT_LOG_ENABLED:
+        match_log.start_match(game_state["match_id"], seed)
+    publish_snapshot()
+
+def recover_from_event_log():
+    """Replays commands logged after the restored checkpoint, then keeps appending to that log."""
+    match_id = game_state["match_id"]
+    path = event_log.log_path(match_id)
+    if not os.path.exists(path):
+        print(f"[EVENT LOG] No log for match {match_id}; resuming from the checkpoint alone.")
+        match_log.start_match(match_id, game_state.get("seed") or 0)
+        return
+    events, valid_length = event_log.read_events(path)
+    tail = event_log.events_after_checkpoint(events, game_state["tick"])
+    if tail is None:
+        print(f"[EVENT LOG] Checkpoint for tick {game_state['tick']} not found in {path}; skipping replay.")
+        tail = []
+    event_log.replay(game_state, tail)
+    match_log.resume_match(match_id, valid_length)
+    print(f"[EVENT LOG] Replayed {len(tail)} events, now at tick {game_state['tick']}.")
+
+def restore_or_generate_world():
+    """Warm-restores the last checkpointed match if there is one, otherwise builds a new world."""
+    if PERSISTENCE_ENABLED:
+        try:
+            restored = persistence_engine.restore_match(mongo.db)
+            if restored:
+                game_state.update(restored)
+                simulation_engine.rebuild_state_indexes(game_state)
+                print(f"[SERVER] Restored match {restored['match_id']} at tick {restored['tick']}.")
+                if EVENT_LOG_ENABLED:
+                    recover_from_event_log()
+                publish_snapshot()
+                return
+        except Exception as e:
+            print(f"[PERSISTENCE ERROR] Restore failed, generating a new world: {e}")
+
+    start_match()
+
+# Deep sanitizer to catch both Numpy KEYS and VALUES for the API response
+def sanitize(obj):
+    if isinstance(obj, dict):
+        # JSON strictly requires strings for keys.
+        return {str(k): sanitize(v) for k, v in obj.items()}
+    elif isinstance(obj, list) or isinstance(obj, tuple):
+        return [sanitize(x) for x in obj]
+    elif type(obj).__module__ == 'numpy':
+        if hasattr(obj, 'item'):
+            return obj.item()
+        elif hasattr(obj, 'tolist'):
+            return obj.tolist()
+    return obj
+
+def gamestate_payload():
+    """The /api/gamestate document: the static world plus the fortress and sector state."""
+    return sanitize({
+        "vertices": game_state["vertices"],
+        "faces": game_state["faces"],
+        "face_colors": game_state["face_colors"],
+        "sector_owners": game_state.get("sector_owners", {}),
+        "roads": game_state["roads"],
+        "fortresses": game_state["fortresses"].stored(),
+        "neutral_garrisons": fortress_engine.neutral_garrison_payload(game_state),
+        "adj": game_state["adj"],
+        "races": RACES,
+        "fortress_types": FORTRESS_TYPES,
+        "fortress_type_names": fortress_engine.FORTRESS_TYPE_NAMES,
+        "terrain_build_options": TERRAIN_BUILD_OPTIONS
+    })
+
+def publish_snapshot():
+    """Simulation role: hands workers the world for /api/gamestate. Fortress and sector state
+    in it goes stale, but every joining client is re-synced in full right after."""
+    if SERVER_ROLE == 'simulation':
+        command_queue.publish_snapshot(json.dumps(gamestate_payload()))
+
+def full_color_payload():
+    """Every face colour plus the owners of faces that have been held (absent means unclaimed);
+    only sent on connect and restart, ticks send deltas."""
+    return {
+        "colors": game_state["face_colors"],
+        "owners": game_state["sector_owners"],
+        "owner_names": fortress_engine.get_owner_names(game_state)
+    }
+
+def fortress_map_payload():
+    """Every fortress for a full client sync; untouched neutral ones travel as columns."""
+    return {
+        "fortresses": game_state["fortresses"].stored(),
+        "neutral_garrisons": fortress_engine.neutral_garrison_payload(game_state)
+    }
+
+def broadcast_fortress_frame(tick_frame=False):
+    """Sends fortresses changed since the last frame to every client. tick_frame marks the
+    game loop's frame, as opposed to one sent in reply to a command."""
+    frame = fortress_engine.pop_fortress_frame(game_state)
+    if frame:
+        frame["tick_frame"] = tick_frame
+        frame["sent_at"] = time.time()
+        socketio.emit('fortress_frame', wire_engine.encode('fortress_frame', frame))
+
+def broadcast_face_deltas():
+    face_deltas = combat_engine.pop_face_deltas(game_state)
+    if face_deltas:
+        socketio.emit('face_deltas', wire_engine.encode('face_deltas', face_deltas))
+
 # --- Background Task (The Game Loop) ---
 def background_thread():
     while True:
@@ -91,37 +219,89 @@ def background_thread():
             if not game_state["initialized"]:
                 continue
                 
-            map_changed = False
-            color_changed = False
+            simulation_engine.run_tick(game_state)
+            if EVENT_LOG_ENABLED:
+                match_log.record(event_log.EV_TICK, tick=game_state["tick"])
+
+            # Checkpoint (only copies dirty state; the writer task does the I/O)
+            if PERSISTENCE_ENABLED and persistence_engine.maybe_checkpoint(game_state):
+                if EVENT_LOG_ENABLED:
+                    match_log.record(event_log.EV_CHECKPOINT, tick=game_state["tick"])
+
+            # Frames and deltas are emitted under the lock, in the order they were popped:
+            # clients apply them blindly, so a command's frame must never overtake an older
+            # tick frame. emit only queues; each event is encoded once for every recipient.
+            broadcast_face_deltas()
+            broadcast_fortress_frame(tick_frame=True)
+
+# --- Player Commands (run wherever game_state lives) ---
+def sync_client(sid):
+    """Full colours and fortresses for one client; afterwards it only receives changes."""
+    with thread_lock:
+        socketio.emit('update_face_colors', full_color_payload(), to=sid)
+        socketio.emit('update_map', fortress_map_payload(), to=sid)
 
-            # 1. Sector Dominance
-            if combat_engine.process_sector_dominance(game_state):
-                color_changed = True
+def assign_home_sector(username, sid):
+    with thread_lock:
+        is_returning = bool(fortress_engine.get_owned_fortress_ids(game_state, username))
+        focus = simulation_engine.join_player(game_state, username)
+        if EVENT_LOG_ENABLED:
+            match_log.record(event_log.EV_JOIN, username=username)
+
+        if focus:
+            socketio.emit('focus_camera', {'position': focus}, to=sid)
+        if is_returning:
+            return
+
+        broadcast_face_deltas()
+        broadcast_fortress_frame()
 
-            # 2. AI Logic
-            process_ai_turn(game_state)
+def run_command(cmd, username, sid=None, **args):
+    """Applies one player command to game_state and broadcasts the result."""
+    if cmd == 'join':
+        sync_client(sid)
+        assign_home_sector(username, sid)
+    elif cmd == 'restart':
+        with thread_lock:
+            start_match()
             
-            # 3. Fortress Production
-            if fortress_engine.process_fortress_production(game_state):
-                map_changed = True
-                
-            # 4. Fortress Upgrades
-            if fortress_engine.process_fortress_upgrades(game_state):
-                map_changed = True
-                
-            # 5. Combat / Attack Paths
-            if combat_engine.process_combat_flows(game_state):
-                map_changed = True
-
-        # Broadcast Updates outside of lock to prevent blocking
-        if color_changed:
-            socketio.emit('update_face_colors', {
-                "colors": game_state["face_colors"],
-                "owners": game_state["sector_owners"]
-            })
-        
-        if map_changed:
-            socketio.emit('update_map', game_state["fortresses"])
+            assign_home_sector(username, sid)
+            socketio.emit('update_map', fortress_map_payload())
+            socketio.emit('update_face_colors', full_color_payload())
+    elif cmd == 'move':
+        with thread_lock:
+            src_id, tgt_id = args.get('source'), args.get('target')
+            if not simulation_engine.apply_move(game_state, username, src_id, tgt_id):
+                return
+            if EVENT_LOG_ENABLED:
+                match_log.record(event_log.EV_MOVE, username=username, source=src_id, target=tgt_id)
+            
+            broadcast_fortress_frame()
+    elif cmd == 'specialize':
+        with thread_lock:
+            fid, new_type = args.get('id'), args.get('type')
+            if simulation_engine.apply_specialize(game_state, username, fid, new_type):
+                if EVENT_LOG_ENABLED:
+                    match_log.record(event_log.EV_SPECIALIZE, username=username, id=fid, type=new_type)
+                broadcast_fortress_frame()
+
+def submit_command(cmd, username, sid=None, **args):
+    """Workers forward commands to the simulation process; otherwise they run here."""
+    if SERVER_ROLE == 'worker':
+        command_queue.push(dict(args, cmd=cmd, username=username, sid=sid))
+    else:
+        run_command(cmd, username, sid, **args)
+
+def command_loop():
+    """Simulation role: applies commands forwarded by the workers in arrival order."""
+    while True:
+        command = command_queue.pop()
+        if not command:
+            continue
+        try:
+            run_command(**command)
+        except Exception as e:
+            print(f"[SERVER] Command {command.get('cmd')} from {command.get('username')} failed: {e}")
 
 # --- App Factory ---
 def create_app():
@@ -132,15 +312,41 @@ def create_app():
     socketio.init_app(app)
     login_manager.init_app(app)
 
+    global command_queue, thread
+    if SERVER_ROLE not in ('standalone', 'worker', 'simulation'):
+        raise ValueError(f"Unknown SERVER_ROLE {SERVER_ROLE!r}")
+    if SERVER_ROLE != 'standalone':
+        if not SOCKETIO_MESSAGE_QUEUE:
+            raise ValueError(f"SERVER_ROLE {SERVER_ROLE!r} needs SOCKETIO_MESSAGE_QUEUE")
+        command_queue = cluster_engine.CommandQueue(SOCKETIO_MESSAGE_QUEUE)
+        socketio.start_background_task(command_queue.listen_user_invalidations, user_cache.invalidate)
+
     # Pre-initialize world state before handling any traffic
-    with thread_lock:
-        if not game_state["initialized"]: 
-            print("[SERVER] Initializing world...")
-            world_data = world_engine.generate_game_world()
-            game_state.update(world_data)
-            game_state["fortresses"] = fortress_engine.initialize_fortresses(game_state)
-            game_state["initialized"] = True
-            print("[SERVER] World successfully generated and ready.")
+    if SERVER_ROLE != 'worker':
+        with thread_lock:
+            if not game_state["initialized"]: 
+                print("[SERVER] Initializing world...")
+                restore_or_generate_world()
+                game_state["initialized"] = True
+                print("[SERVER] World successfully generated and ready.")
+
+    try:
+        auth_engine.ensure_user_indexes(mongo.db)
+    except Exception as e:
+        print(f"[SERVER] Could not create user indexes: {e}")
+
+    if PERSISTENCE_ENABLED and SERVER_ROLE != 'worker':
+        try:
+            persistence_engine.ensure_indexes(mongo.db)
+        except Exception as e:
+            print(f"[PERSISTENCE ERROR] Could not create checkpoint indexes: {e}")
+        socketio.start_background_task(persistence_engine.writer_loop, mongo.db)
+    if EVENT_LOG_ENABLED and SERVER_ROLE != 'worker':
+        offload = async_engine.offload if SOCKETIO_ASYNC_MODE != 'threading' else None
+        socketio.start_background_task(match_log.writer_loop, socketio.sleep, offload)
+    if SERVER_ROLE == 'simulation':
+        thread = socketio.start_background_task(background_thread)
+        socketio.start_background_task(command_loop)
 
     @app.route('/')
     @login_required
@@ -158,9 +364,11 @@ def create_app():
             password = request.form.get('password')
             try:
                 user_doc = mongo.db.users.find_one({"email": email})
-                if user_doc and User(user_doc).check_password(password):
-                    login_user(User(user_doc))
-                    if not User(user_doc).username:
+                user = User(user_doc) if user_doc else None
+                if user and user.check_password(password):
+                    user_cache.put(user.get_id(), user_doc)
+                    login_user(user)
+                    if not user.username:
                         return redirect(url_for('create_username'))
                     else:
                         return redirect(url_for('index'))
@@ -180,7 +388,7 @@ def create_app():
                 if mongo.db.users.find_one({"email": email}):
                     flash('Email in use.', 'danger')
                     return redirect(url_for('register'))
-                hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
+                hashed_pw = auth_engine.run_bcrypt(bcrypt.generate_password_hash, password).decode('utf-8')
                 mongo.db.users.insert_one({'email': email, 'password_hash': hashed_pw, 'username': None, 'race': None})
                 flash('Account created!', 'success')
                 return redirect(url_for('login'))
@@ -205,44 +413,22 @@ def create_app():
                 flash('Taken.', 'danger')
                 return redirect(url_for('create_username'))
             mongo.db.users.update_one({'_id': ObjectId(current_user.get_id())}, {'$set': {'username': new_username, 'race': 'Human'}})
+            user_cache.invalidate(current_user.get_id())
+            if command_queue is not None:
+                command_queue.publish_user_invalidation(current_user.get_id())
             return redirect(url_for('index'))
         return render_template('create_username.html', title='Create Username')
 
     @app.route('/api/gamestate')
     def get_gamestate_api():
         try:
+            if SERVER_ROLE == 'worker':
+                raw = command_queue.load_snapshot()
+                if raw is None:
+                    return jsonify({"error": "Simulation has not published a world yet"}), 503
+                return Response(raw, mimetype='application/json')
             with thread_lock:
-                from config import FORTRESS_TYPES, RACES, TERRAIN_BUILD_OPTIONS
-                
-                # Deep sanitizer to catch both Numpy KEYS and VALUES for the API response
-                def sanitize(obj):
-                    if isinstance(obj, dict):
-                        # JSON strictly requires strings for keys.
-                        return {str(k): sanitize(v) for k, v in obj.items()}
-                    elif isinstance(obj, list) or isinstance(obj, tuple):
-                        return [sanitize(x) for x in obj]
-                    elif type(obj).__module__ == 'numpy':
-                        if hasattr(obj, 'item'):
-                            return obj.item()
-                        elif hasattr(obj, 'tolist'):
-                            return obj.tolist()
-                    return obj
-
-                payload = {
-                    "vertices": game_state["vertices"],
-                    "faces": game_state["faces"],
-                    "face_colors": game_state["face_colors"],
-                    "sector_owners": game_state.get("sector_owners", {}),
-                    "roads": game_state["roads"],
-                    "fortresses": game_state["fortresses"],
-                    "adj": game_state["adj"],
-                    "races": RACES,
-                    "fortress_types": FORTRESS_TYPES,
-                    "terrain_build_options": TERRAIN_BUILD_OPTIONS
-                }
-                
-                safe_payload = sanitize(payload)
-                return jsonify(safe_payload)
+                return jsonify(gamestate_payload())
         except Exception as e:
             import traceback
             print(f"[API ERROR] Failed to serialize gamestate: {e}")
@@ -252,161 +438,35 @@ def create_app():
     @socketio.on('connect')
     def handle_connect():
         global thread
-        with thread_lock:
-            if thread is None:
-                thread = socketio.start_background_task(background_thread)
+        if SERVER_ROLE == 'standalone':
+            with thread_lock:
+                if thread is None:
+                    thread = socketio.start_background_task(background_thread)
             
-            if current_user.is_authenticated:
-                emit('update_face_colors', {
-                    "colors": game_state["face_colors"],
-                    "owners": game_state["sector_owners"]
-                })
-                emit('update_map', game_state["fortresses"])
-                assign_home_sector(current_user)
+        if current_user.is_authenticated:
+            submit_command('join', current_user.username, request.sid)
 
     @socketio.on('restart_game')
     @login_required
     def handle_restart():
-        with thread_lock:
-            world_data = world_engine.generate_game_world()
-            game_state.update(world_data)
-            game_state["fortresses"] = fortress_engine.initialize_fortresses(game_state)
-            game_state["sector_owners"] = {}
-            game_state["dominance_cache"] = {}
-            
-            assign_home_sector(current_user)
-            emit('update_map', game_state["fortresses"], broadcast=True)
-            emit('update_face_colors', {
-                "colors": game_state["face_colors"],
-                "owners": game_state["sector_owners"]
-            }, broadcast=True)
-
-    def assign_home_sector(user):
-        with thread_lock:
-            spawn_ai_sector()
-            
-            existing_forts = [f for f in game_state["fortresses"].values() if f['owner'] == user.username]
-            if existing_forts:
-                vid = int(existing_forts[0]['id'])
-                v_pos = game_state["vertices"][vid]
-                emit('focus_camera', {'position': v_pos})
-                return 
-            
-            available_faces = list(enumerate(game_state["faces"]))
-            random.shuffle(available_faces)
-
-            for i, face in available_faces:
-                terrain = game_state.get("face_terrain", [])[i]
-                if terrain in ["Deep Sea", "Sea"]:
-                    continue
-                
-                v1, v2, v3 = [str(x) for x in face]
-                if any(game_state["fortresses"][v]['owner'] for v in [v1, v2, v3]):
-                    continue
-
-                game_state["face_colors"][i] = int(world_engine.darken_color(RACES["Human"]["color"], factor=0.4))
-                units = int(STARTING_UNITS_POOL // 3)
-                
-                for vid in [v1, v2, v3]:
-                    game_state["fortresses"][vid].update({
-                        "owner": user.username,
-                        "units": units,
-                        "race": "Human",
-                        "is_capital": True,
-                        "special_active": True,
-                        "tier": 1,
-                        "paths": [],
-                        "type": "Keep" 
-                    })
-                game_state["sector_owners"][str(i)] = user.username
-                
-                coords = [game_state["vertices"][int(v)] for v in [v1, v2, v3]]
-                cx = float(sum(c[0] for c in coords) / 3)
-                cy = float(sum(c[1] for c in coords) / 3)
-                cz = float(sum(c[2] for c in coords) / 3)
-                
-                emit('focus_camera', {'position': [cx, cy, cz]})
-                break
-
-            emit('update_face_colors', {
-                "colors": game_state["face_colors"],
-                "owners": game_state["sector_owners"]
-            }, broadcast=True)
-            emit('update_map', game_state["fortresses"], broadcast=True)
-
-    def spawn_ai_sector():
-        if any(f['owner'] == AI_NAME for f in game_state["fortresses"].values()):
-            return
-        
-        available_faces = list(enumerate(game_state["faces"]))
-        random.shuffle(available_faces)
-        
-        for i, face in available_faces:
-            if game_state.get("face_terrain", [])[i] in ["Deep Sea", "Sea", "Mountain"]:
-                continue
-            
-            v1, v2, v3 = [str(x) for x in face]
-            if not any(game_state["fortresses"][v]['owner'] for v in [v1, v2, v3]):
-                ai_color = RACES["Orc"]["color"]
-                game_state["face_colors"][i] = int(world_engine.darken_color(ai_color, factor=0.4))
-                
-                units = int(STARTING_UNITS_POOL // 3)
-                for vid in [v1, v2, v3]:
-                    game_state["fortresses"][vid].update({
-                        "owner": AI_NAME,
-                        "units": units,
-                        "race": "Orc",
-                        "is_capital": True,
-                        "special_active": True,
-                        "tier": 1,
-                        "paths": [],
-                        "type": "Keep"
-                    })
-                game_state["sector_owners"][str(i)] = AI_NAME
-                return
+        submit_command('restart', current_user.username, request.sid)
 
     @socketio.on('submit_move')
     @login_required
     def handle_move(data):
-        with thread_lock:
-            src_id = str(data.get('source'))
-            tgt_id = str(data.get('target'))
-            if src_id not in game_state["fortresses"] or tgt_id not in game_state["fortresses"]:
-                return
-            src_fort = game_state["fortresses"][src_id]
-            if src_fort['owner'] != current_user.username:
-                return
-            
-            if int(tgt_id) not in game_state["adj"].get(int(src_id), []):
-                return
-
-            if tgt_id in src_fort['paths']:
-                src_fort['paths'].remove(tgt_id)
-            else:
-                if len(src_fort['paths']) < src_fort['tier']:
-                    src_fort['paths'].append(tgt_id)
-            
-            emit('update_map', game_state["fortresses"], broadcast=True)
+        submit_command('move', current_user.username, source=data.get('source'), target=data.get('target'))
 
     @socketio.on('specialize_fortress')
     @login_required
     def handle_specialize(data):
-        with thread_lock:
-            fid = str(data.get('id'))
-            new_type = data.get('type')
-            if fid not in game_state["fortresses"]:
-                return
-            fort = game_state["fortresses"][fid]
-            if fort['owner'] != current_user.username:
-                return
-            
-            allowed = TERRAIN_BUILD_OPTIONS.get(fort.get('land_type', 'Plain'), ["Keep"])
-            if new_type in allowed:
-                fort['type'] = new_type
-                emit('update_map', game_state["fortresses"], broadcast=True)
+        submit_command('specialize', current_user.username, id=data.get('id'), type=data.get('type'))
 
     return app
 
 if __name__ == '__main__':
     app = create_app()
-    socketio.run(app, debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
+    if SERVER_ROLE == 'simulation':
+        print("[SERVER] Simulation process running; workers serve the clients.")
+        while True:
+            socketio.sleep(60)
+    socketio.run(app, debug=True, host='127.0.0.1', port=SERVER_PORT)
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Valhalla Async Engine: selects the Socket.IO concurrency model and keeps blocking work off it.
+
+'threading' gives every client an OS thread and is the development default.
+'eventlet' and 'gevent' run clients, the tick loop and the background writers as
+green threads. Socket I/O (including pymongo) becomes cooperative once patched;
+CPU-bound or file-blocking calls (bcrypt, fsync) must go through offload().
+"""
+from config import SOCKETIO_ASYNC_MODE
+
+ASYNC_MODES = ("threading", "eventlet", "gevent")
+
+
+def monkey_patch():
+    """Must run before anything imports socket, threading or pymongo."""
+    if SOCKETIO_ASYNC_MODE not in ASYNC_MODES:
+        raise ValueError(f"SOCKETIO_ASYNC_MODE must be one of {ASYNC_MODES}, got {SOCKETIO_ASYNC_MODE!r}")
+    if SOCKETIO_ASYNC_MODE == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    elif SOCKETIO_ASYNC_MODE == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def offload(fn, *args, **kwargs):
+    """Runs a blocking call on a native worker thread and waits for it without stalling the loop.
+    In threading mode the caller already owns an OS thread, so the call runs inline."""
+    if SOCKETIO_ASYNC_MODE == "eventlet":
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    if SOCKETIO_ASYNC_MODE == "gevent":
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,59 @@
+"""
+Valhalla Auth Engine: keeps the login and session path from starving the game.
+User documents are served from a short-lived LRU cache instead of one Mongo read per
+request, and bcrypt runs with a bounded number of hashes in flight.
+"""
+import threading
+import time
+from collections import OrderedDict
+import async_engine
+from config import USER_CACHE_SIZE, USER_CACHE_TTL, BCRYPT_WORKERS
+
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_WORKERS)
+
+
+class UserCache:
+    """LRU of user documents keyed by id string; entries expire ttl seconds after being stored."""
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._docs.get(user_id)
+            if entry is None:
+                return None
+            doc, expires = entry
+            if expires <= self.clock():
+                del self._docs[user_id]
+                return None
+            self._docs.move_to_end(user_id)
+            return doc
+
+    def put(self, user_id, doc):
+        with self._lock:
+            self._docs[user_id] = (doc, self.clock() + self.ttl)
+            self._docs.move_to_end(user_id)
+            while len(self._docs) > self.maxsize:
+                self._docs.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._docs.pop(user_id, None)
+
+
+def run_bcrypt(fn, *args):
+    """Runs a bcrypt call with at most BCRYPT_WORKERS in flight; the rest queue here
+    instead of each holding a CPU. Green-thread modes also move the hash off the loop."""
+    with _bcrypt_slots:
+        return async_engine.offload(fn, *args)
+
+
+def ensure_user_indexes(db):
+    db.users.create_index("email", unique=True)
+    # Accounts have no username until create_username, so only string values must be unique
+    db.users.create_index("username", unique=True, partialFilterExpression={"username": {"$type": "string"}})
@@ -0,0 +1,51 @@
+"""
+Valhalla Cluster Engine: the link between Socket.IO worker processes and the one
+simulation process that owns game_state.
+
+Workers push player commands onto a shared Redis list; the simulation pops them in
+arrival order and broadcasts through the Socket.IO message queue. The world payload
+for /api/gamestate is published under a key so workers never hold game state, and
+user-cache invalidations are published on a channel every process listens to.
+Any Redis-compatible server works.
+"""
+import json
+from config import COMMAND_QUEUE_KEY, GAMESTATE_SNAPSHOT_KEY, USER_INVALIDATION_CHANNEL
+
+
+class CommandQueue:
+    def __init__(self, url, key=COMMAND_QUEUE_KEY, snapshot_key=GAMESTATE_SNAPSHOT_KEY,
+                 invalidation_channel=USER_INVALIDATION_CHANNEL, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.key = key
+        self.snapshot_key = snapshot_key
+        self.invalidation_channel = invalidation_channel
+
+    def push(self, command):
+        self.client.rpush(self.key, json.dumps(command))
+
+    def pop(self, timeout=1):
+        """Blocks up to timeout seconds. Returns the next command dict or None."""
+        item = self.client.blpop([self.key], timeout=timeout)
+        return json.loads(item[1]) if item else None
+
+    def publish_snapshot(self, raw_json):
+        self.client.set(self.snapshot_key, raw_json)
+
+    def load_snapshot(self):
+        return self.client.get(self.snapshot_key)
+
+    def publish_user_invalidation(self, user_id):
+        self.client.publish(self.invalidation_channel, str(user_id))
+
+    def listen_user_invalidations(self, on_invalidate):
+        """Background task: calls on_invalidate(user_id) for every id any process publishes,
+        including this one. Messages sent while disconnected are lost; the cache TTL covers those."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.invalidation_channel)
+        for message in pubsub.listen():
+            data = message["data"]
+            on_invalidate(data.decode("utf-8") if isinstance(data, bytes) else str(data))
@@ -1,87 +1,167 @@
 import random
-from config import (
-    FORTRESS_TYPES, RACES, FLOW_RATE, TERRAIN_BONUSES, 
-    SPECIAL_UNITS, CLASS_MULTIPLIERS
-)
+from config import RACES, FLOW_RATE, TERRAIN_COLORS, SPECIAL_UNITS
 from world_engine import darken_color
+import combat_tables as ct
+import fortress_engine
+import routing_engine
+from persistence_engine import mark_dirty
 
 PACKET_SPEED = 0.05 
 COLLISION_THRESHOLD = 0.05
+BATCH_CLASH_MIN = 64  # Below this many stacks in a tick's clashes, NumPy setup costs more than it saves
+# Owned vertices per face above which one vectorised pass over every face beats
+# visiting just the faces around each owned vertex
+DENSE_OWNED_PER_FACE = 1 / 128
+# Packets that agree on all of these (and on position) fight and move as one stack
+STACK_KEY_FIELDS = ("owner", "race", "direction", "unit_class", "type", "atk_bonus", "is_special", "destination", "patrol_face")
 
 def get_fortress_dynamic_stats(fort):
-    f_type = FORTRESS_TYPES.get(fort['type'], FORTRESS_TYPES["Keep"])
+    t = ct.TYPE_IDS.get(fort['type'], ct.KEEP_ID)
     stats = {
-        "atk_mod": f_type["atk_mod"],
-        "def_mod": f_type["def_mod"],
-        "cap": f_type["cap"],
-        "gen_mult": f_type["gen_mult"],
-        "unit_class": f_type.get("unit_class", "Soldier"),
+        "atk_mod": ct.TYPE_ATK[t],
+        "def_mod": ct.TYPE_DEF[t],
+        "cap": ct.TYPE_CAP[t],
+        "gen_mult": ct.TYPE_GEN[t],
+        "unit_class": ct.TYPE_CLASS[t],
         "range": 0 
     }
-    for t in fort.get("neighbor_terrains", []):
-        if t in TERRAIN_BONUSES:
-            b = TERRAIN_BONUSES[t]
-            stats["atk_mod"] += b.get("atk_mod", 0.0)
-            stats["def_mod"] += b.get("def_mod", 0.0)
-            stats["cap"] += b.get("cap", 0)
-            stats["gen_mult"] += b.get("gen_mult", 0.0)
-            stats["range"] += b.get("range", 0)
+    for terrain in fort.get("neighbor_terrains", []):
+        b = ct.TERRAIN_BONUS_ROWS.get(terrain)
+        if b:
+            stats["atk_mod"] += b[0]
+            stats["def_mod"] += b[1]
+            stats["cap"] += b[2]
+            stats["gen_mult"] += b[3]
+            stats["range"] += b[4]
     return stats
 
+def get_sector_color(game_state, face_idx, owner):
+    """Owned sectors take a darkened race colour; unowned ones show their terrain."""
+    if owner:
+        v_ex = game_state["faces"][face_idx][0]
+        race_name = game_state["fortresses"].peek(str(v_ex))['race']
+        if race_name in RACES:
+            return darken_color(RACES[race_name]['color'], 0.3)
+        return game_state["face_colors"][face_idx]
+    return TERRAIN_COLORS.get(game_state["face_terrain"][face_idx], 0xff00ff)
+
+def mark_face_dirty(game_state, face_idx):
+    game_state.setdefault("dirty_faces", set()).add(int(face_idx))
+
+def pop_face_deltas(game_state):
+    """Packs changed faces as a flat [index, colour, owner_id, ...] list and clears the dirty set."""
+    dirty = game_state.get("dirty_faces")
+    game_state["dirty_faces"] = set()
+    if not dirty:
+        return None
+    packed = []
+    for idx in sorted(dirty):
+        owner = game_state["sector_owners"].get(str(idx))
+        packed.extend((idx, int(game_state["face_colors"][idx]), fortress_engine.get_owner_id(game_state, owner)))
+    return {"deltas": packed, "owner_names": fortress_engine.pop_new_owner_names(game_state)}
+
+def get_dominance_columns(game_state):
+    """NumPy columns for the dense dominance pass, rebuilt whenever the faces list is replaced."""
+    cols = game_state.get("dominance_columns")
+    if cols is None or cols["faces_ref"] is not game_state["faces"]:
+        faces = game_state["faces"]
+        num_vertices = len(game_state["vertices"])
+        cols = {
+            "faces_ref": faces,
+            "faces": ct.np.array(faces, dtype=ct.np.int32).reshape(len(faces), 3),
+            "vertex_owner": ct.np.zeros(num_vertices, dtype=ct.np.int32),
+            "vertex_tier": ct.np.zeros(num_vertices, dtype=ct.np.int8),
+        }
+        game_state["dominance_columns"] = cols
+    return cols
+
+def dominated_faces(game_state):
+    """[(face_idx, owner, tier_sum), ...] in face order for every face whose three
+    vertices share an owner."""
+    owned = sum(len(fids) for fids in game_state.get("owner_index", {}).values())
+    if ct.np is None or owned < len(game_state["faces"]) * DENSE_OWNED_PER_FACE:
+        return _dominated_faces_sparse(game_state)
+    np = ct.np
+    cols = get_dominance_columns(game_state)
+    fortresses = game_state["fortresses"]
+    vertex_owner, vertex_tier = cols["vertex_owner"], cols["vertex_tier"]
+    vertex_owner[:] = 0
+    # Ids are local to this call; only owned vertices need writing
+    owner_names = [None]
+    for owner, fids in game_state.get("owner_index", {}).items():
+        oid = len(owner_names)
+        owner_names.append(owner)
+        for fid in fids:
+            vertex_owner[int(fid)] = oid
+            vertex_tier[int(fid)] = fortresses.peek(fid)['tier']
+
+    owners = vertex_owner[cols["faces"]]
+    held = np.flatnonzero((owners[:, 0] != 0) & (owners[:, 0] == owners[:, 1]) & (owners[:, 1] == owners[:, 2]))
+    tiers = vertex_tier[cols["faces"][held]].sum(axis=1).tolist()
+    return [(idx, owner_names[oid], tier_sum) for idx, oid, tier_sum in zip(held.tolist(), owners[held, 0].tolist(), tiers)]
+
+def _dominated_faces_sparse(game_state):
+    # Only faces touching an owned vertex can be held, so early in a match scan just those
+    fortresses = game_state["fortresses"]
+    faces = game_state["faces"]
+    vertex_faces = game_state["vertex_faces"]
+    candidates = set()
+    for fids in game_state.get("owner_index", {}).values():
+        for fid in fids:
+            candidates.update(vertex_faces[int(fid)])
+    held = []
+    for idx in sorted(candidates):
+        v1, v2, v3 = (str(v) for v in faces[idx])
+        owner = fortresses.owner(v1)
+        if owner and owner == fortresses.owner(v2) == fortresses.owner(v3):
+            held.append((idx, owner, fortresses.peek(v1)['tier'] + fortresses.peek(v2)['tier'] + fortresses.peek(v3)['tier']))
+    return held
+
 def process_sector_dominance(game_state):
+    """Faces held on all three vertices become owned sectors; flips and sanctuaries are applied
+    in face order.
+    sector_owners is sparse: faces never held are absent, and a face that is lost stays with
+    owner None so the next checkpoint and colour delta clear it. Read it with .get()."""
     changes_made = False
-    face_ownership = {}
     current_sanctuaries = game_state.get("sanctuaries", {})
-    dominance_cache = {} 
-    
-    for idx, face in enumerate(game_state["faces"]):
+    faces = game_state["faces"]
+    face_ownership = {}
+    dominance_cache = {}
+
+    for idx, owner, tier_sum in dominated_faces(game_state):
         face_id = str(idx)
-        v1, v2, v3 = [str(x) for x in face]
-        f1 = game_state["fortresses"].get(v1)
-        f2 = game_state["fortresses"].get(v2)
-        f3 = game_state["fortresses"].get(v3)
-        
-        o1 = f1.get('owner') if f1 else None
-        o2 = f2.get('owner') if f2 else None
-        o3 = f3.get('owner') if f3 else None
-        
-        if o1 and o1 == o2 and o2 == o3:
-            owner = o1
-            face_ownership[face_id] = owner
-            dominance_cache[v1] = owner
-            dominance_cache[v2] = owner
-            dominance_cache[v3] = owner
-            
-            avg_tier = (f1['tier'] + f2['tier'] + f3['tier']) / 3.0
-            if face_id not in current_sanctuaries:
-                current_sanctuaries[face_id] = {"owner": owner, "avg_tier": avg_tier, "cooldown": 10, "race": f1['race']}
-                changes_made = True
-            else:
-                if current_sanctuaries[face_id]["avg_tier"] != avg_tier:
-                    current_sanctuaries[face_id]["avg_tier"] = avg_tier
-                    changes_made = True
-        else:
-            face_ownership[face_id] = None
-            if face_id in current_sanctuaries:
-                del current_sanctuaries[face_id]
-                changes_made = True
-    
+        face_ownership[face_id] = owner
+        for v in faces[idx]:
+            dominance_cache[str(v)] = owner
+
+        avg_tier = tier_sum / 3.0
+        if face_id not in current_sanctuaries:
+            race = game_state["fortresses"].peek(str(faces[idx][0]))['race']
+            current_sanctuaries[face_id] = {"owner": owner, "avg_tier": avg_tier, "cooldown": 10, "race": race}
+            changes_made = True
+        elif current_sanctuaries[face_id]["avg_tier"] != avg_tier:
+            current_sanctuaries[face_id]["avg_tier"] = avg_tier
+            changes_made = True
+
+    for face_id in [f for f in current_sanctuaries if f not in face_ownership]:
+        del current_sanctuaries[face_id]
+        changes_made = True
+
     game_state["dominance_cache"] = dominance_cache
 
-    if face_ownership != game_state.get("sector_owners", {}):
-        game_state["sector_owners"] = face_ownership
-        for f_idx, owner in face_ownership.items():
-            idx = int(f_idx)
-            if owner:
-                v_ex = game_state["faces"][idx][0]
-                race_name = game_state["fortresses"][str(v_ex)]['race']
-                if race_name in RACES:
-                    base_c = RACES[race_name]['color']
-                    game_state["face_colors"][idx] = darken_color(base_c, 0.3)
-            else:
-                from config import TERRAIN_COLORS
-                t_type = game_state["face_terrain"][idx]
-                game_state["face_colors"][idx] = TERRAIN_COLORS.get(t_type, 0xff00ff)
+    # Only faces held now or before can flip; they are recoloured and queued for the client
+    sector_owners = game_state.setdefault("sector_owners", {})
+    candidates = set(face_ownership)
+    candidates.update(f_idx for f_idx, owner in sector_owners.items() if owner)
+    for f_idx in sorted(candidates, key=int):
+        owner = face_ownership.get(f_idx)
+        if sector_owners.get(f_idx) == owner:
+            continue
+        sector_owners[f_idx] = owner
+        idx = int(f_idx)
+        game_state["face_colors"][idx] = get_sector_color(game_state, idx, owner)
+        mark_face_dirty(game_state, idx)
+        mark_dirty(game_state, "sectors", f_idx)
         changes_made = True
 
     return changes_made
@@ -89,6 +169,7 @@ def process_sector_dominance(game_state):
 def process_special_spawns(game_state):
     changes_made = False
     edges = game_state.get("edges", {})
+    rng = game_state.get("rng", random)
     for face_id, sanct in game_state.get("sanctuaries", {}).items():
         if sanct["cooldown"] > 0:
             sanct["cooldown"] -= 1
@@ -98,8 +179,8 @@ def process_special_spawns(game_state):
         spec_stats = SPECIAL_UNITS[unit_type]
         sanct["cooldown"] = spec_stats["cooldown"]
         face_vertices = game_state["faces"][int(face_id)]
-        v_a = random.choice(face_vertices)
-        v_b = random.choice([v for v in face_vertices if v != v_a])
+        v_a = rng.choice(face_vertices)
+        v_b = rng.choice([v for v in face_vertices if v != v_a])
         edge_key = str(tuple(sorted((v_a, v_b))))
         if edge_key in edges:
             edge = edges[edge_key]
@@ -107,9 +188,11 @@ def process_special_spawns(game_state):
             new_packet = {
                 "owner": sanct["owner"], "race": sanct["race"], "amount": spec_stats["size"],
                 "pos": 0.5, "direction": direction, "type": unit_type, "unit_class": unit_type,
+                "race_id": ct.race_id(sanct["race"]), "class_id": ct.class_id(unit_type),
                 "atk_bonus": spec_stats["atk"], "is_special": True, "patrol_face": int(face_id) if unit_type == "Hero" else None 
             }
             edge["packets"].append(new_packet)
+            mark_dirty(game_state, "edges", edge_key)
             changes_made = True
     return changes_made
 
@@ -120,8 +203,8 @@ def process_combat_flows(game_state):
     if process_special_spawns(game_state):
         changes_made = True
         
-    for fid, fort in game_state["fortresses"].items():
-        if not fort['paths'] or not fort['owner']: continue
+    for fid, fort in fortress_engine.iter_owned_fortresses(game_state):
+        if not fort['paths']: continue
         spawn_amount = FLOW_RATE 
         if fort['units'] >= spawn_amount:
             for target_id in fort['paths']:
@@ -136,13 +219,20 @@ def process_combat_flows(game_state):
                     new_packet = {
                         "owner": fort['owner'], "race": fort['race'], "amount": spawn_amount,
                         "pos": start_pos, "direction": direction, "type": fort['type'],
-                        "unit_class": stats["unit_class"], "atk_bonus": stats["atk_mod"], "is_special": False
+                        "unit_class": stats["unit_class"], "atk_bonus": stats["atk_mod"], "is_special": False,
+                        "race_id": ct.race_id(fort['race']), "class_id": ct.class_id(stats["unit_class"]),
+                        "destination": fort.get('routes', {}).get(str(target_id))
                     }
                     edges[edge_key]["packets"].append(new_packet)
+                    mark_dirty(game_state, "fortresses", fid)
+                    mark_dirty(game_state, "edges", edge_key)
                     changes_made = True
                     
+    clashes = []
+    clashed_edges = []
     for key, edge in edges.items():
         if not edge["packets"]: continue
+        mark_dirty(game_state, "edges", key)
         
         has_mage_fwd = any(p["unit_class"] == "Mage" and p["direction"] == 1 for p in edge["packets"])
         has_mage_rev = any(p["unit_class"] == "Mage" and p["direction"] == -1 for p in edge["packets"])
@@ -154,10 +244,11 @@ def process_combat_flows(game_state):
         reverse_flow = [p for p in edge["packets"] if p["direction"] == -1]
         
         clash_point = edge.get("battle_point", 0.5)
+        contested = bool(forward_flow and reverse_flow and forward_flow[-1]["owner"] != reverse_flow[0]["owner"])
         
         if forward_flow and reverse_flow:
             # If flows are from different factions, they move toward each other
-            if forward_flow[-1]["owner"] != reverse_flow[0]["owner"]:
+            if contested:
                 fwd_power = sum(p["amount"] for p in forward_flow)
                 rev_power = sum(p["amount"] for p in reverse_flow)
                 total_power = fwd_power + rev_power
@@ -179,12 +270,12 @@ def process_combat_flows(game_state):
             
             speed = PACKET_SPEED
             if p.get("is_special"):
-                s_type = p["type"]
-                if s_type in SPECIAL_UNITS:
-                    speed *= SPECIAL_UNITS[s_type]["speed"]
+                speed_mult = ct.SPECIAL_SPEED_MULT.get(p["type"])
+                if speed_mult is not None:
+                    speed *= speed_mult
             
             # Packets move but are clamped by the clash point if an enemy is present
-            if forward_flow and reverse_flow and forward_flow[-1]["owner"] != reverse_flow[0]["owner"]:
+            if contested:
                 if p["direction"] == 1:
                     p["pos"] = min(clash_point, p["pos"] + speed)
                 else:
@@ -195,18 +286,23 @@ def process_combat_flows(game_state):
             p["pos"] = max(0.0, min(1.0, p["pos"]))
             active_packets.append(p)
             
-        # Collision Resolution at Clash Point
-        if forward_flow and reverse_flow:
-            lead_fwd = forward_flow[-1]
-            lead_rev = reverse_flow[0]
-            if lead_fwd["owner"] != lead_rev["owner"] and abs(lead_fwd["pos"] - lead_rev["pos"]) < COLLISION_THRESHOLD:
-                dmg_fwd = calculate_packet_damage(lead_fwd, lead_rev, game_state, True)
-                dmg_rev = calculate_packet_damage(lead_rev, lead_fwd, game_state, True)
-                lead_fwd["amount"] -= dmg_rev
-                lead_rev["amount"] -= dmg_fwd
-                changes_made = True
-                
+        if contested:
+            # Columns queue up on the clash point; fold each queue into stacks so it stays bounded
+            active_packets = merge_stacks(active_packets)
         edge["packets"] = [p for p in active_packets if p["amount"] > 0]
+
+        # Collision at Clash Point: collected here, resolved for all edges at once below
+        if contested:
+            front = clash_fronts(edge["packets"])
+            if front:
+                clashes.append(front)
+                clashed_edges.append(edge)
+
+    if clashes:
+        resolve_clashes(clashes, game_state)
+        for edge in clashed_edges:
+            edge["packets"] = [p for p in edge["packets"] if p["amount"] > 0]
+        changes_made = True
         
     for key, edge in edges.items():
         surviving_packets = []
@@ -222,9 +318,11 @@ def process_combat_flows(game_state):
                     redirect_hero(p, target_id, game_state)
                     changes_made = True
                 else:
-                    target = game_state["fortresses"].get(target_id)
-                    if target:
-                        apply_packet_arrival(target, p, game_state)
+                    if game_state["fortresses"].has(target_id):
+                        # Indexing stores an untouched neutral target before it is attacked
+                        target = game_state["fortresses"].materialize(target_id)
+                        if not forward_routed_packet(p, target, game_state):
+                            apply_packet_arrival(target, p, game_state)
                         changes_made = True
             else:
                 surviving_packets.append(p)
@@ -248,34 +346,107 @@ def redirect_hero(packet, current_node_id, game_state):
         packet["pos"] = 0.0 if direction == 1 else 1.0
         packet["direction"] = direction
         edges[next_edge_key]["packets"].append(packet)
+        mark_dirty(game_state, "edges", next_edge_key)
     else:
         packet["amount"] = 0
 
+def forward_routed_packet(packet, target, game_state):
+    """Relays a routed packet onward from an owned waypoint. Returns False if it should land here."""
+    destination = packet.get("destination")
+    if destination is None or target['owner'] != packet['owner'] or str(destination) == str(target['id']):
+        return False
+    curr = int(target['id'])
+    next_v = routing_engine.next_hop(game_state, curr, destination, packet['owner'])
+    next_edge_key = str(tuple(sorted((curr, next_v)))) if next_v is not None else None
+    edges = game_state["edges"]
+    if next_edge_key not in edges:
+        return False
+    direction = 1 if curr < next_v else -1
+    packet["pos"] = 0.0 if direction == 1 else 1.0
+    packet["direction"] = direction
+    edges[next_edge_key]["packets"].append(packet)
+    mark_dirty(game_state, "edges", next_edge_key)
+    return True
+
+def merge_stacks(packets):
+    """Coalesces packets with the same position and STACK_KEY_FIELDS into the first of them.
+    Damage is linear in amount, so a stack hits exactly as hard as its parts did."""
+    heads = {}
+    merged = []
+    for p in packets:
+        key = (p["pos"],) + tuple(p.get(f) for f in STACK_KEY_FIELDS)
+        head = heads.get(key)
+        if head is None:
+            heads[key] = p
+            merged.append(p)
+        else:
+            head["amount"] += p["amount"]
+    return merged
+
+def clash_fronts(packets):
+    """The forward and reverse stacks in contact at the clash point, or None if the columns
+    have not met. Only stacks of each lead's owner take part."""
+    forward = [p for p in packets if p["direction"] == 1]
+    reverse = [p for p in packets if p["direction"] == -1]
+    if not forward or not reverse:
+        return None
+    lead_fwd = max(forward, key=lambda p: p["pos"])
+    lead_rev = min(reverse, key=lambda p: p["pos"])
+    if lead_fwd["owner"] == lead_rev["owner"] or abs(lead_fwd["pos"] - lead_rev["pos"]) >= COLLISION_THRESHOLD:
+        return None
+    front_fwd = [p for p in forward if p["pos"] == lead_fwd["pos"] and p["owner"] == lead_fwd["owner"]]
+    front_rev = [p for p in reverse if p["pos"] == lead_rev["pos"] and p["owner"] == lead_rev["owner"]]
+    return front_fwd, front_rev
+
+def absorb_damage(stacks, damage):
+    """Shares damage across stacks in proportion to their size."""
+    if len(stacks) == 1:
+        stacks[0]["amount"] -= damage
+        return
+    total = sum(p["amount"] for p in stacks)
+    if total <= 0:
+        return
+    for p in stacks:
+        p["amount"] -= damage * p["amount"] / total
+
+def resolve_clashes(clashes, game_state):
+    """Resolves every clash of this tick: each front deals its full stacked damage to the other.
+    Large batches go through NumPy; both paths multiply in the same order, so replays match."""
+    stacks = [p for front_fwd, front_rev in clashes for p in front_fwd + front_rev]
+    if ct.np is not None and len(stacks) >= BATCH_CLASH_MIN:
+        damage = ct.clash_damage_batch(stacks).tolist()
+    else:
+        damage = [calculate_packet_damage(p, None, game_state, True) for p in stacks]
+
+    i = 0
+    for front_fwd, front_rev in clashes:
+        n_fwd, n_rev = len(front_fwd), len(front_rev)
+        dmg_fwd = sum(damage[i:i + n_fwd])
+        dmg_rev = sum(damage[i + n_fwd:i + n_fwd + n_rev])
+        i += n_fwd + n_rev
+        absorb_damage(front_fwd, dmg_rev)
+        absorb_damage(front_rev, dmg_fwd)
+
 def calculate_packet_damage(attacker, defender, game_state, is_clash=False):
-    atk_race = RACES.get(attacker['race'], RACES["Human"])
-    base_pwr = atk_race.get('base_atk', 1.0)
-    fort_bonus = attacker.get("atk_bonus", 1.0)
-    mage_buff = attacker.get("current_buff", 1.0)
-    class_mult, atk_class = 1.0, attacker.get("unit_class", "Soldier")
-    def_type = "Unit"
+    def_kind = ct.DEF_UNIT
     if not is_clash and isinstance(defender, dict) and "units" in defender:
-        def_type = "Fortress" 
-    if atk_class in CLASS_MULTIPLIERS:
-        class_mult = CLASS_MULTIPLIERS[atk_class].get(def_type, 1.0)
-    return attacker['amount'] * base_pwr * fort_bonus * mage_buff * class_mult
+        def_kind = ct.DEF_FORTRESS
+    return ct.attack_damage(attacker, def_kind)
 
 def apply_packet_arrival(target, packet, game_state):
+    mark_dirty(game_state, "fortresses", target['id'])
     if target['owner'] == packet['owner']:
         target['units'] += packet['amount']
     else:
         def_stats = get_fortress_dynamic_stats(target)
-        def_race = RACES.get(target['race'], RACES["Neutral"])
-        def_mult = def_race.get('base_def', 1.0) * def_stats['def_mod']
+        def_mult = ct.RACE_DEF[ct.race_id(target['race'], ct.NEUTRAL_ID)] * def_stats['def_mod']
         damage = calculate_packet_damage(packet, target, game_state, is_clash=False)
         defense_val = target['units'] * def_mult
         if damage > defense_val:
-            target['owner'] = packet['owner']
+            fortress_engine.set_fortress_owner(game_state, target['id'], packet['owner'])
             target['race'] = packet['race']
             target['units'], target['paths'], target['tier'], target['type'] = 1.0, [], 1, 'Keep'
+            target['routes'] = {}
+            routing_engine.invalidate_routes(game_state)
         else:
             target['units'] = max(0, (defense_val - damage) / def_mult)
\ No newline at end of file
@@ -9,6 +9,42 @@ SECRET_KEY = os.environ.get('FLASK_SECRET_KEY', 'a-default-secret-key-for-develo
 MONGO_URI = "mongodb://localhost:27017/valhalla_db"
 GOOGLE_OAUTH_CLIENT_ID = os.environ.get('GOOGLE_OAUTH_CLIENT_ID')
 GOOGLE_OAUTH_CLIENT_SECRET = os.environ.get('GOOGLE_OAUTH_CLIENT_SECRET')
+USER_CACHE_SIZE = 1024  # User documents kept in memory for load_user
+# Seconds before a cached user document is re-read from MongoDB. Across worker processes,
+# invalidations travel over USER_INVALIDATION_CHANNEL; the TTL bounds staleness if one is missed
+USER_CACHE_TTL = 60.0
+BCRYPT_WORKERS = 4  # Password hashes allowed to run at once
+
+# --- Server Concurrency ---
+# 'threading' for development; 'eventlet' or 'gevent' (with gevent-websocket) for many concurrent clients
+SOCKETIO_ASYNC_MODE = os.environ.get('VALHALLA_ASYNC_MODE', 'threading')
+
+# --- Wire Format ---
+# 'json' or 'msgpack' (binary fortress frames and face deltas, needs the msgpack package)
+WIRE_FORMAT = os.environ.get('VALHALLA_WIRE_FORMAT', 'json')
+WIRE_COMPRESSION = os.environ.get('VALHALLA_WIRE_COMPRESSION', '1') == '1'  # Deflate payloads over the threshold
+WIRE_COMPRESSION_THRESHOLD = 1024  # Bytes
+
+# --- Scale-out ---
+# 'standalone' runs sockets and the simulation in one process. To spread connections over
+# cores, run one 'simulation' process plus any number of 'worker' processes (behind a
+# sticky load balancer), all sharing SOCKETIO_MESSAGE_QUEUE.
+SERVER_ROLE = os.environ.get('VALHALLA_ROLE', 'standalone')
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('VALHALLA_MESSAGE_QUEUE')  # e.g. redis://localhost:6379/0
+SERVER_PORT = int(os.environ.get('VALHALLA_PORT', '5000'))
+COMMAND_QUEUE_KEY = 'valhalla:commands'
+GAMESTATE_SNAPSHOT_KEY = 'valhalla:gamestate'
+USER_INVALIDATION_CHANNEL = 'valhalla:user-invalidations'
+
+# --- Match Persistence (MongoDB checkpoints) ---
+PERSISTENCE_ENABLED = os.environ.get('VALHALLA_PERSISTENCE', '1') == '1'
+CHECKPOINT_INTERVAL_TICKS = 10  # Incremental write of dirty fortresses/sectors/edges
+FULL_SNAPSHOT_EVERY_CHECKPOINTS = 30  # Every Nth checkpoint rewrites the whole match
+
+# --- Event Log (binary command journal for replay and crash recovery) ---
+EVENT_LOG_ENABLED = os.environ.get('VALHALLA_EVENT_LOG', '1') == '1'
+EVENT_LOG_DIR = os.environ.get('VALHALLA_EVENT_LOG_DIR', 'match_logs')
+EVENT_LOG_FSYNC_INTERVAL = 1.0  # Seconds between batched write+fsync
 
 # ==========================================
 #        WORLD GENERATION PARAMETERS
@@ -23,17 +59,20 @@ MAX_SUBTERRANEAN_SEA_PERCENT = 0.15
 
 # Environmental Hazards and Biomes
 LAVA_RIVERS = True
-NUM_LAVA_RIVERS = 25
-LAVA_RIVERS_MIN_LENGTH = 15
-LAVA_RIVERS_MAX_LENGTH = 35
+NUM_LAVA_RIVERS = 2
+LAVA_RIVERS_MIN_LENGTH = 3
+LAVA_RIVERS_MAX_LENGTH = 8
 SPAWN_CHANCE_WASTE = 0.03
 SPAWN_CHANCE_FARM = 0.02
 SPAWN_CHANCE_CAVERN = 0.005
+NUM_MOUNTAIN_RANGES = 2
 MOUNTAIN_RANGE_MIN_LENGTH = 8
 MOUNTAIN_RANGE_MAX_LENGTH = 22
 
 # Spherical Geometry
 ICO_SUBDIVISIONS = 2  
+# Range and river counts above are tuned for this subdivision level (lengths are in faces);
+# larger spheres multiply the counts by their extra surface area
 
 # Visual Biome Palette
 TERRAIN_COLORS = {
@@ -60,8 +99,24 @@ TICK_RATE = 1.0  # Seconds between logic updates
 STARTING_UNITS_POOL = 45 
 NEUTRAL_GARRISON_MIN = 5
 NEUTRAL_GARRISON_MAX = 100
+# 'eager' builds every neutral fortress at match start; 'sparse' derives untouched ones from
+# (seed, vertex id) when first needed, so memory follows play instead of ICO_SUBDIVISIONS
+FORTRESS_STORAGE = os.environ.get('VALHALLA_FORTRESS_STORAGE', 'eager')
 FLOW_RATE = 0.5  # Units per tick subtracted from fort and sent into path
 
+# Multi-hop Routing: cost of stepping onto a vertex touching each terrain (default 1.0)
+ROUTE_TERRAIN_COSTS = {
+    "Mountain": 3.0,
+    "Lava": 2.5,
+    "Swamp": 2.0,
+    "Hill": 1.5,
+    "Forest": 1.5,
+    "Sea": 2.0,
+    "Deep Sea": 4.0
+}
+ROUTE_NEUTRAL_COST = 5.0   # Extra cost for ending a route on a neutral fortress
+ROUTE_HOSTILE_COST = 10.0  # Extra cost for ending a route on an enemy fortress
+
 # Upgrades
 UPGRADE_COST_TIER_2 = 50
 UPGRADE_COST_TIER_3 = 120
@@ -123,6 +178,9 @@ TERRAIN_BONUSES = {
     "Sea": {"gen_mult": 0.05}
 }
 
+# Terrains a new player's home sector may not sit on
+SPAWN_EXCLUDED_TERRAINS = ("Deep Sea", "Sea")
+
 # --- AI Personality Profiles ---
 AI_DIFFICULTY = "Normal" 
 AI_PROFILES = {
@@ -0,0 +1,223 @@
+"""
+Valhalla Event Log: an append-only binary journal of everything that feeds the simulation.
+One file per match holds the seed, a marker per tick, every accepted player command
+and a marker per queued checkpoint. Replaying it through simulation_engine rebuilds
+the match exactly, either from the seed or from the last MongoDB checkpoint.
+
+File layout: MAGIC, then records of <u8 type><u16 payload length><payload>.
+Strings are <u16 length><utf-8 bytes>; integers are little-endian.
+The match start record carries the world generator version; replay refuses logs from
+any other version, since the same seed would grow a different world.
+"""
+import os
+import struct
+import threading
+import time
+from config import EVENT_LOG_DIR, EVENT_LOG_FSYNC_INTERVAL, ICO_SUBDIVISIONS
+import simulation_engine
+from world_engine import WORLDGEN_VERSION
+
+MAGIC = b"VHLG\x02"
+
+EV_MATCH_START = 1
+EV_TICK = 2
+EV_JOIN = 3
+EV_MOVE = 4
+EV_SPECIALIZE = 5
+EV_CHECKPOINT = 6
+
+_HEADER = struct.Struct("<BH")
+
+
+class ReplayDivergence(Exception):
+    pass
+
+
+def _pack_str(value):
+    raw = (value or "").encode("utf-8")
+    return struct.pack("<H", len(raw)) + raw
+
+
+def _unpack_str(payload, offset):
+    (length,) = struct.unpack_from("<H", payload, offset)
+    offset += 2
+    return payload[offset:offset + length].decode("utf-8"), offset + length
+
+
+def encode_event(ev_type, fields):
+    if ev_type == EV_MATCH_START:
+        payload = struct.pack("<QBB", fields["seed"], fields["subdivisions"], fields["worldgen"]) + _pack_str(fields["match_id"])
+    elif ev_type in (EV_TICK, EV_CHECKPOINT):
+        payload = struct.pack("<I", fields["tick"])
+    elif ev_type == EV_JOIN:
+        payload = _pack_str(fields["username"])
+    elif ev_type == EV_MOVE:
+        payload = _pack_str(fields["username"]) + struct.pack("<II", int(fields["source"]), int(fields["target"]))
+    elif ev_type == EV_SPECIALIZE:
+        payload = _pack_str(fields["username"]) + struct.pack("<I", int(fields["id"])) + _pack_str(fields["type"])
+    else:
+        raise ValueError(f"Unknown event type {ev_type}")
+    return _HEADER.pack(ev_type, len(payload)) + payload
+
+
+def decode_event(ev_type, payload):
+    if ev_type == EV_MATCH_START:
+        seed, subdivisions, worldgen = struct.unpack_from("<QBB", payload, 0)
+        match_id, _ = _unpack_str(payload, 10)
+        return {"seed": seed, "subdivisions": subdivisions, "worldgen": worldgen, "match_id": match_id}
+    if ev_type in (EV_TICK, EV_CHECKPOINT):
+        return {"tick": struct.unpack_from("<I", payload, 0)[0]}
+    if ev_type == EV_JOIN:
+        return {"username": _unpack_str(payload, 0)[0]}
+    if ev_type == EV_MOVE:
+        username, offset = _unpack_str(payload, 0)
+        source, target = struct.unpack_from("<II", payload, offset)
+        return {"username": username, "source": source, "target": target}
+    if ev_type == EV_SPECIALIZE:
+        username, offset = _unpack_str(payload, 0)
+        (fid,) = struct.unpack_from("<I", payload, offset)
+        new_type, _ = _unpack_str(payload, offset + 4)
+        return {"username": username, "id": fid, "type": new_type}
+    raise ValueError(f"Unknown event type {ev_type}")
+
+
+def read_events(path):
+    """Returns ([(type, fields), ...], valid_length). A torn final record is dropped."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a Valhalla event log")
+    events = []
+    offset = len(MAGIC)
+    while offset + _HEADER.size <= len(data):
+        ev_type, length = _HEADER.unpack_from(data, offset)
+        end = offset + _HEADER.size + length
+        if end > len(data):
+            break
+        events.append((ev_type, decode_event(ev_type, data[offset + _HEADER.size:end])))
+        offset = end
+    return events, offset
+
+
+def log_path(match_id, log_dir=EVENT_LOG_DIR):
+    return os.path.join(log_dir, f"{match_id}.vlog")
+
+
+# --- Replay ---
+
+def apply_event(game_state, ev_type, fields):
+    """Feeds one recorded event back through the simulation."""
+    if ev_type == EV_MATCH_START:
+        if fields["subdivisions"] != ICO_SUBDIVISIONS:
+            raise ReplayDivergence(f"Log was recorded with ICO_SUBDIVISIONS={fields['subdivisions']}")
+        if fields["worldgen"] != WORLDGEN_VERSION:
+            raise ReplayDivergence(f"Log was recorded with world generator v{fields['worldgen']}")
+        simulation_engine.new_match(game_state, fields["seed"], fields["match_id"])
+    elif ev_type == EV_TICK:
+        simulation_engine.run_tick(game_state)
+        if game_state["tick"] != fields["tick"]:
+            raise ReplayDivergence(f"Replay reached tick {game_state['tick']}, log says {fields['tick']}")
+    elif ev_type == EV_JOIN:
+        simulation_engine.join_player(game_state, fields["username"])
+    elif ev_type == EV_MOVE:
+        simulation_engine.apply_move(game_state, fields["username"], fields["source"], fields["target"])
+    elif ev_type == EV_SPECIALIZE:
+        simulation_engine.apply_specialize(game_state, fields["username"], fields["id"], fields["type"])
+
+
+def events_after_checkpoint(events, tick):
+    """Slices off everything up to and including the checkpoint marker for tick."""
+    for idx in range(len(events) - 1, -1, -1):
+        ev_type, fields = events[idx]
+        if ev_type == EV_CHECKPOINT and fields["tick"] == tick:
+            return events[idx + 1:]
+    return None
+
+
+def replay(game_state, events, on_tick=None):
+    """Applies events in order. on_tick(game_state) runs after every replayed tick."""
+    for ev_type, fields in events:
+        apply_event(game_state, ev_type, fields)
+        if ev_type == EV_TICK and on_tick:
+            on_tick(game_state)
+    return game_state
+
+
+# --- Writer ---
+
+class EventLog:
+    """Buffers encoded records in memory; flush() writes and fsyncs them in one batch."""
+
+    def __init__(self, log_dir=EVENT_LOG_DIR, fsync_interval=EVENT_LOG_FSYNC_INTERVAL):
+        self.log_dir = log_dir
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._ops = []  # bytes to append, or (path, fresh, valid_length) to switch files
+        self._file = None
+
+    def start_match(self, match_id, seed):
+        """Rotates to a new per-match file whose first record is the seed."""
+        os.makedirs(self.log_dir, exist_ok=True)
+        header = MAGIC + encode_event(EV_MATCH_START, {
+            "seed": seed, "subdivisions": ICO_SUBDIVISIONS, "worldgen": WORLDGEN_VERSION, "match_id": match_id
+        })
+        with self._lock:
+            self._ops.append((log_path(match_id, self.log_dir), True, None))
+            self._ops.append(header)
+
+    def resume_match(self, match_id, valid_length):
+        """Continues appending to an existing file, cutting off any torn tail first."""
+        with self._lock:
+            self._ops.append((log_path(match_id, self.log_dir), False, valid_length))
+
+    def record(self, ev_type, **fields):
+        data = encode_event(ev_type, fields)
+        with self._lock:
+            if self._ops and isinstance(self._ops[-1], bytearray):
+                self._ops[-1] += data
+            else:
+                self._ops.append(bytearray(data))
+
+    def flush(self):
+        self._write_ops(self._take_ops())
+
+    def _take_ops(self):
+        with self._lock:
+            ops, self._ops = self._ops, []
+        return ops
+
+    def _write_ops(self, ops):
+        dirty = False
+        for op in ops:
+            if isinstance(op, tuple):
+                if dirty:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    dirty = False
+                path, fresh, valid_length = op
+                if self._file:
+                    self._file.close()
+                self._file = open(path, "wb" if fresh else "r+b")
+                if not fresh:
+                    self._file.truncate(valid_length)
+                    self._file.seek(valid_length)
+            elif self._file:
+                self._file.write(op)
+                dirty = True
+        if dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def writer_loop(self, sleep=time.sleep, offload=None):
+        """Background task: one write+fsync per interval instead of one per event.
+        offload(fn, *args) runs the file I/O off the event loop in green-thread modes."""
+        while True:
+            sleep(self.fsync_interval)
+            try:
+                ops = self._take_ops()
+                if offload:
+                    offload(self._write_ops, ops)
+                else:
+                    self._write_ops(ops)
+            except Exception as e:
+                print(f"[EVENT LOG ERROR] Flush failed: {e}")
@@ -2,52 +2,294 @@
 Valhalla Fortress Engine: Resource Generation and Construction Logic.
 Handles the state of Vertices as strategic fortification points.
 """
+import bisect
+import functools
+import itertools
 import random
 from config import (
     FORTRESS_TYPES, NEUTRAL_GARRISON_MIN, NEUTRAL_GARRISON_MAX,
-    UPGRADE_COST_TIER_2, UPGRADE_COST_TIER_3, TERRAIN_BUILD_OPTIONS
+    UPGRADE_COST_TIER_2, UPGRADE_COST_TIER_3, TERRAIN_BUILD_OPTIONS, FORTRESS_STORAGE,
+    SPAWN_EXCLUDED_TERRAINS
 )
+from persistence_engine import mark_dirty
 
-def initialize_fortresses(game_state):
-    """Sets initial structures and neutral garrisons based on vertex biome touch."""
-    num_vertices = len(game_state["vertices"])
-    faces = game_state["faces"]
-    face_terrain = game_state["face_terrain"]
-    
-    vertex_neighbors = {i: set() for i in range(num_vertices)}
-    for f_idx, face in enumerate(faces):
-        for v in face: vertex_neighbors[v].add(face_terrain[f_idx])
-            
-    fortresses = {}
-    for i in range(num_vertices):
-        neighbors = list(vertex_neighbors[i])
-        
-        # Structure Pool: The UNION of what can be built on all surrounding terrain types
-        valid_pool = set()
-        for t in neighbors:
-            valid_pool.update(TERRAIN_BUILD_OPTIONS.get(t, TERRAIN_BUILD_OPTIONS["Default"]))
-        
-        valid_list = list(valid_pool) if valid_pool else ["Keep"]
-        
-        # Select structure using probability weights from config
-        weighted = {ft: FORTRESS_TYPES[ft]["prob"] for ft in valid_list if ft in FORTRESS_TYPES}
-        choice = random.choices(list(weighted.keys()), weights=list(weighted.values()))[0] if weighted else "Keep"
-
-        fortresses[str(i)] = {
-            "id": i, "owner": None, "units": random.randint(NEUTRAL_GARRISON_MIN, NEUTRAL_GARRISON_MAX),
-            "race": "Neutral", "is_capital": False, "tier": 1, "paths": [], "type": choice,
-            "neighbor_terrains": neighbors
-        }
+FORTRESS_TYPE_NAMES = list(FORTRESS_TYPES)
+FORTRESS_TYPE_IDS = {name: i for i, name in enumerate(FORTRESS_TYPE_NAMES)}
+SPAWN_SAMPLE_ATTEMPTS = 32
+
+_MASK64 = (1 << 64) - 1
+
+def _mix64(x):
+    """splitmix64 finaliser: a cheap, well-spread hash of one 64-bit integer."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+@functools.lru_cache(maxsize=None)
+def _structure_weights(neighbors):
+    """(types, cumulative weights) a neutral fortress touching these terrains may start as."""
+    valid_pool = set()
+    for t in neighbors:
+        valid_pool.update(TERRAIN_BUILD_OPTIONS.get(t, TERRAIN_BUILD_OPTIONS["Default"]))
+    names = [ft for ft in sorted(valid_pool) if ft in FORTRESS_TYPES]
+    return names, list(itertools.accumulate(FORTRESS_TYPES[ft]["prob"] for ft in names))
+
+def neutral_garrison(seed, vid, neighbors):
+    """(type, units) of the untouched neutral fortress at vid, a pure function of its arguments."""
+    h = _mix64(_mix64(seed) ^ vid)
+    names, cum_weights = _structure_weights(neighbors)
+    choice = "Keep"
+    if names:
+        pick = (h >> 11) / float(1 << 53) * cum_weights[-1]
+        choice = names[bisect.bisect(cum_weights, pick, 0, len(names) - 1)]
+    return choice, NEUTRAL_GARRISON_MIN + _mix64(h) % (NEUTRAL_GARRISON_MAX - NEUTRAL_GARRISON_MIN + 1)
+
+def neutral_fortress(seed, vid, neighbors):
+    """The untouched neutral fortress at vid, rebuilt whenever needed instead of stored."""
+    choice, units = neutral_garrison(seed, vid, neighbors)
+    return {
+        "id": vid, "owner": None, "units": units, "race": "Neutral", "is_capital": False,
+        "tier": 1, "paths": [], "routes": {}, "type": choice, "neighbor_terrains": list(neighbors)
+    }
+
+class FortressMap:
+    """Fortresses by id string. Only fortresses that have been touched are stored, in a plain
+    dict; given a seed, every other vertex holds a neutral garrison derived from (seed, vertex id).
+    peek() and owner() read any fortress without storing it, materialize() returns one for
+    writing, storing it first, and stored() is the dict checkpoints and full syncs send."""
+
+    def __init__(self, stored=(), seed=None, vertex_faces=None, face_terrain=None):
+        self._stored = dict(stored)
+        self.seed = seed
+        self.vertex_faces = vertex_faces
+        self.face_terrain = face_terrain
+        self._garrison_columns = None
+
+    def _vertex_id(self, fid):
+        # Only canonical id strings are derivable, so every fortress has exactly one key
+        if self.seed is None or not isinstance(fid, str) or not fid.isdigit():
+            return None
+        vid = int(fid)
+        return vid if vid < len(self.vertex_faces) and fid == str(vid) else None
+
+    def _neighbors(self, vid):
+        return tuple(sorted({self.face_terrain[f_idx] for f_idx in self.vertex_faces[vid]}))
+
+    def _derive(self, vid):
+        return neutral_fortress(self.seed, vid, self._neighbors(vid))
+
+    def stored(self):
+        return self._stored
+
+    def has(self, fid):
+        """True if fid names a fortress, stored or not."""
+        return fid in self._stored or self._vertex_id(fid) is not None
+
+    def peek(self, fid):
+        """The fortress at fid; an untouched one is derived afresh and not stored."""
+        fort = self._stored.get(fid)
+        if fort is not None:
+            return fort
+        vid = self._vertex_id(fid)
+        if vid is None:
+            raise KeyError(fid)
+        return self._derive(vid)
+
+    def materialize(self, fid):
+        """The fortress at fid, stored from now on so changes to it persist."""
+        fort = self._stored.get(fid)
+        if fort is None:
+            fort = self._stored[fid] = self.peek(fid)
+        return fort
+
+    def owner(self, fid):
+        fort = self._stored.get(fid)
+        return fort['owner'] if fort else None
+
+    def materialize_all(self):
+        for vid in range(len(self.vertex_faces) if self.seed is not None else 0):
+            self.materialize(str(vid))
+
+    def garrison_columns(self):
+        """Derived type id and units of every vertex, for clients to fill in the fortresses
+        that are not stored. Computed once per world; derivations never change."""
+        if self._garrison_columns is None:
+            types, units = [], []
+            for vid in range(len(self.vertex_faces)):
+                choice, garrison = neutral_garrison(self.seed, vid, self._neighbors(vid))
+                types.append(FORTRESS_TYPE_IDS.get(choice, 0))
+                units.append(garrison)
+            self._garrison_columns = {"types": types, "units": units}
+        return self._garrison_columns
+
+def build_vertex_faces(game_state):
+    """Faces touching each vertex, in face order; kept as game_state['vertex_faces']."""
+    vertex_faces = [[] for _ in range(len(game_state["vertices"]))]
+    for f_idx, face in enumerate(game_state["faces"]):
+        for v in face: vertex_faces[v].append(f_idx)
+    game_state["vertex_faces"] = vertex_faces
+    return vertex_faces
+
+def initialize_fortresses(game_state, storage=FORTRESS_STORAGE):
+    """Fortress map for a fresh world. 'sparse' storage leaves untouched neutral garrisons to be
+    derived on demand; 'eager' builds them all up front. Both play identically."""
+    vertex_faces = build_vertex_faces(game_state)
+    fortresses = FortressMap(seed=game_state["seed"], vertex_faces=vertex_faces, face_terrain=game_state["face_terrain"])
+    if storage == "eager":
+        fortresses.materialize_all()
     return fortresses
 
+def build_owner_index(fortresses):
+    """Maps each owner to the set of fortress ids it holds. Neutral forts are not indexed."""
+    index = {}
+    for fid, fort in fortresses.stored().items():
+        if fort['owner']:
+            index.setdefault(fort['owner'], set()).add(fid)
+    return index
+
+def set_fortress_owner(game_state, fid, owner):
+    """Changes a fortress's owner and keeps the owner index in sync."""
+    fid = str(fid)
+    fort = game_state["fortresses"].materialize(fid)
+    index = game_state.setdefault("owner_index", {})
+    old_owner = fort['owner']
+    if old_owner and old_owner in index:
+        index[old_owner].discard(fid)
+        if not index[old_owner]:
+            del index[old_owner]
+    fort['owner'] = owner
+    mark_dirty(game_state, "fortresses", fid)
+    if owner:
+        index.setdefault(owner, set()).add(fid)
+    if bool(old_owner) != bool(owner) and "spawn_index" in game_state:
+        _refresh_spawn_faces(game_state, int(fid))
+
+def _is_spawn_face(game_state, face_idx):
+    if game_state["face_terrain"][face_idx] in SPAWN_EXCLUDED_TERRAINS:
+        return False
+    fortresses = game_state["fortresses"]
+    return not any(fortresses.owner(str(v)) for v in game_state["faces"][face_idx])
+
+def _add_spawn_face(spawn_index, face_idx):
+    if face_idx not in spawn_index["pos"]:
+        spawn_index["pos"][face_idx] = len(spawn_index["faces"])
+        spawn_index["faces"].append(face_idx)
+
+def _remove_spawn_face(spawn_index, face_idx):
+    # Swap-remove keeps both removal and random sampling O(1)
+    pos = spawn_index["pos"].pop(face_idx, None)
+    if pos is None:
+        return
+    last = spawn_index["faces"].pop()
+    if last != face_idx:
+        spawn_index["faces"][pos] = last
+        spawn_index["pos"][last] = pos
+
+def _refresh_spawn_faces(game_state, vid):
+    spawn_index = game_state["spawn_index"]
+    for face_idx in spawn_index["vertex_faces"][vid]:
+        if _is_spawn_face(game_state, face_idx):
+            _add_spawn_face(spawn_index, face_idx)
+        else:
+            _remove_spawn_face(spawn_index, face_idx)
+
+def build_spawn_index(game_state, faces_order=None):
+    """Indexes land faces whose three vertices are all neutral, i.e. valid home sectors.
+    A checkpointed faces_order is reused as-is so restored matches sample identically."""
+    vertex_faces = game_state.get("vertex_faces") or build_vertex_faces(game_state)
+    spawn_index = {"faces": [], "pos": {}, "vertex_faces": vertex_faces}
+    game_state["spawn_index"] = spawn_index
+    for f_idx in (faces_order if faces_order is not None else range(len(game_state["faces"]))):
+        if _is_spawn_face(game_state, f_idx):
+            _add_spawn_face(spawn_index, f_idx)
+    return spawn_index
+
+def sample_spawn_face(game_state, excluded_terrains=SPAWN_EXCLUDED_TERRAINS):
+    """Picks a random free home sector avoiding excluded_terrains, or None if none remain."""
+    spawn_index = game_state.get("spawn_index") or build_spawn_index(game_state)
+    rng = game_state.get("rng", random)
+    faces = spawn_index["faces"]
+    face_terrain = game_state["face_terrain"]
+    if not faces:
+        return None
+    for _ in range(SPAWN_SAMPLE_ATTEMPTS):
+        f_idx = faces[rng.randrange(len(faces))]
+        if face_terrain[f_idx] not in excluded_terrains:
+            return f_idx
+    # Rare fallback when the excluded terrains dominate what is left
+    remaining = [f_idx for f_idx in faces if face_terrain[f_idx] not in excluded_terrains]
+    return rng.choice(remaining) if remaining else None
+
+def get_owner_id(game_state, owner):
+    """Small integer id for an owner name (0 = unowned), used to pack face deltas."""
+    if not owner:
+        return 0
+    owner_ids = game_state.setdefault("owner_ids", {})
+    if owner not in owner_ids:
+        owner_ids[owner] = len(owner_ids) + 1
+        game_state.setdefault("new_owner_ids", {})[owner_ids[owner]] = owner
+    return owner_ids[owner]
+
+def get_owner_names(game_state):
+    """Full id -> name table, sent alongside full colour updates."""
+    return {str(oid): name for name, oid in game_state.get("owner_ids", {}).items()}
+
+def pop_new_owner_names(game_state):
+    """Names for owner ids assigned since the last broadcast, keyed by id."""
+    new_names = game_state.pop("new_owner_ids", {})
+    return {str(oid): name for oid, name in new_names.items()}
+
+def pop_fortress_frame(game_state):
+    """Columnar update of fortresses changed since the last frame, laid out for the client's
+    instance buffers: one entry per id, plus path targets flattened with per-fort counts."""
+    changed = game_state.get("frame_fortresses")
+    game_state["frame_fortresses"] = set()
+    if not changed:
+        return None
+    fortresses = game_state["fortresses"]
+    frame = {"ids": [], "owners": [], "units": [], "tiers": [], "types": [], "path_counts": [], "path_targets": []}
+    for vid in sorted(int(fid) for fid in changed):
+        fort = fortresses.peek(str(vid))
+        frame["ids"].append(vid)
+        frame["owners"].append(get_owner_id(game_state, fort['owner']))
+        frame["units"].append(int(fort['units']))
+        frame["tiers"].append(fort['tier'])
+        frame["types"].append(FORTRESS_TYPE_IDS.get(fort['type'], 0))
+        frame["path_counts"].append(len(fort['paths']))
+        frame["path_targets"].extend(int(t) for t in fort['paths'])
+    frame["owner_names"] = pop_new_owner_names(game_state)
+    frame["tick"] = game_state.get("tick", 0)
+    return frame
+
+def neutral_garrison_payload(game_state):
+    """Per-vertex type ids and units of derived neutral garrisons, or None when every
+    fortress is stored. Clients fill in each id missing from the fortress map. Sent with
+    every full sync (connect, restart), never with tick frames."""
+    fortresses = game_state["fortresses"]
+    if fortresses.seed is None or len(fortresses.stored()) == len(fortresses.vertex_faces):
+        return None
+    return fortresses.garrison_columns()
+
+def get_owned_fortress_ids(game_state, owner):
+    """O(1) lookup of the fortress ids held by one owner."""
+    return game_state.get("owner_index", {}).get(owner, set())
+
+def iter_owned_fortresses(game_state):
+    """Yields (fid, fort) for every owned fortress, skipping the neutral majority entirely."""
+    fortresses = game_state["fortresses"]
+    for fids in list(game_state.get("owner_index", {}).values()):
+        for fid in list(fids):
+            yield fid, fortresses.materialize(fid)
+
 def process_fortress_production(game_state):
     """Calculates tick-based unit generation with terrain and dominance bonuses."""
     changes = False
     from config import FORTRESS_TYPES, TERRAIN_BONUSES
+    vertex_faces = game_state["vertex_faces"]
+    sector_owners = game_state["sector_owners"]
     
-    for fid, fort in game_state["fortresses"].items():
-        if not fort['owner']: continue
-        
+    for fid, fort in iter_owned_fortresses(game_state):
         stats = FORTRESS_TYPES[fort['type']]
         final_cap, final_gen = stats['cap'], stats['gen_mult']
         
@@ -58,21 +300,22 @@ def process_fortress_production(game_state):
                 final_gen += TERRAIN_BONUSES[t].get("gen_mult", 0.0)
         
         # Sector Dominance: 50% generation boost if any touching face is fully owned
-        for face in game_state["faces"]:
-            if int(fid) in face and game_state["sector_owners"].get(str(game_state["faces"].index(face))) == fort['owner']:
+        for f_idx in vertex_faces[int(fid)]:
+            if sector_owners.get(str(f_idx)) == fort['owner']:
                 final_gen *= 1.5; break
             
         if fort['units'] < final_cap:
             fort['units'] = min(final_cap, fort['units'] + final_gen); changes = True
+            mark_dirty(game_state, "fortresses", fid)
     return changes
 
 def process_fortress_upgrades(game_state):
     """Automatic logic for spending units to advance fortress tier."""
     changes = False
-    for fid, fort in game_state["fortresses"].items():
-        if not fort['owner']: continue
+    for fid, fort in iter_owned_fortresses(game_state):
         if fort['tier'] < 3:
             cost = UPGRADE_COST_TIER_2 if fort['tier'] == 1 else UPGRADE_COST_TIER_3
             if fort['units'] >= cost + 10: # Keep 10 units for defense
                 fort['units'] -= cost; fort['tier'] += 1; changes = True
+                mark_dirty(game_state, "fortresses", fid)
     return changes
\ No newline at end of file
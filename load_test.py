@@ -0,0 +1,275 @@
+"""
+Load generator: many simulated players against a running Valhalla server.
+
+    python load_test.py --clients 200 --duration 120
+    python load_test.py --url http://127.0.0.1:5000 --clients 1000 --server-pid 12345 --json report.json
+
+Each client registers (or logs in), picks a username, fetches /api/gamestate,
+connects over Socket.IO and then issues moves and specialisations from its own
+fortresses. Reported at the end:
+  - tick jitter: spread of inter-arrival times of consecutive tick frames around TICK_RATE
+  - move latency: submit_move until the frame that carries the source fortress
+  - broadcast latency: arrival of a tick frame minus its server send timestamp (the
+    clocks must agree, so run the load generator on the server host)
+  - broadcast fan-out: per tick, each client's tick-frame arrival minus the first client's
+Frames the server sends in reply to moves and joins are left out of the tick figures.
+  - bytes per client (binary payload size, or JSON-encoded size) and server CPU/RSS summed over its child processes (needs psutil)
+
+Needs python-socketio[asyncio_client] and aiohttp.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+import wire_engine
+from config import TICK_RATE
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(values)
+    return {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+
+
+class Stats:
+    def __init__(self):
+        self.frame_gaps = []
+        self.move_latencies = []
+        self.broadcast_latencies = []
+        self.tick_arrivals = defaultdict(list)
+        self.bytes_received = defaultdict(int)
+        self.moves_sent = 0
+        self.specializes_sent = 0
+        self.errors = 0
+
+
+class SimulatedPlayer:
+    def __init__(self, idx, args, stats):
+        self.idx = idx
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(args.seed * 100003 + idx)
+        self.username = f"{args.prefix}{idx}"
+        self.email = f"{self.username}@loadtest.local"
+        self.password = "loadtest-password"
+        self.world = None
+        self.fortresses = {}
+        self.owner_names = {}
+        self.pending_moves = {}
+        self.last_tick_frame = None
+
+    async def authenticate(self, http):
+        url = self.args.url
+        credentials = {"email": self.email, "password": self.password}
+        await http.post(f"{url}/register", data=credentials)
+        async with http.post(f"{url}/login", data=credentials) as resp:
+            if resp.url.path.endswith("/create_username"):
+                await http.post(f"{url}/create_username", data={"username": self.username})
+            elif resp.url.path.endswith("/login"):
+                raise RuntimeError(f"login failed for {self.email}")
+        async with http.get(f"{url}/api/gamestate") as resp:
+            self.world = await resp.json()
+        self.fortresses = self.world.get("fortresses", {})
+
+    def count_bytes(self, payload):
+        if isinstance(payload, (bytes, bytearray)):
+            self.stats.bytes_received[self.idx] += len(payload)
+        else:
+            self.stats.bytes_received[self.idx] += len(json.dumps(payload, separators=(",", ":")))
+
+    def on_fortress_frame(self, frame):
+        now = time.perf_counter()
+        self.count_bytes(frame)
+        frame = wire_engine.decode("fortress_frame", frame)
+        if frame.get("tick_frame"):
+            tick = frame["tick"]
+            # Ticks that changed nothing send no frame, so only adjacent ticks give a gap
+            if self.last_tick_frame is not None and self.last_tick_frame[0] == tick - 1:
+                self.stats.frame_gaps.append(now - self.last_tick_frame[1])
+            self.last_tick_frame = (tick, now)
+            self.stats.tick_arrivals[tick].append(now)
+            self.stats.broadcast_latencies.append(time.time() - frame["sent_at"])
+
+        self.owner_names.update(frame.get("owner_names", {}))
+        offset = 0
+        for k, fid in enumerate(frame["ids"]):
+            fort = self.fortresses.setdefault(str(fid), {"id": fid})
+            owner_id = frame["owners"][k]
+            fort["owner"] = self.owner_names.get(str(owner_id)) if owner_id else None
+            fort["tier"] = frame["tiers"][k]
+            count = frame["path_counts"][k]
+            fort["paths"] = [str(t) for t in frame["path_targets"][offset:offset + count]]
+            offset += count
+            sent_at = self.pending_moves.pop(str(fid), None)
+            if sent_at is not None:
+                self.stats.move_latencies.append(now - sent_at)
+
+    def on_face_deltas(self, payload):
+        self.count_bytes(payload)
+        self.owner_names.update(wire_engine.decode("face_deltas", payload).get("owner_names") or {})
+
+    def on_owner_names(self, payload):
+        self.count_bytes(payload)
+        if isinstance(payload, dict):
+            self.owner_names.update(payload.get("owner_names") or {})
+
+    def on_update_map(self, payload):
+        self.count_bytes(payload)
+        self.fortresses = payload["fortresses"]
+
+    def owned(self):
+        return [fid for fid, fort in self.fortresses.items() if fort.get("owner") == self.username]
+
+    async def act(self, sio):
+        owned = self.owned()
+        if not owned:
+            return
+        fid = self.rng.choice(sorted(owned, key=int))
+        if self.rng.random() < self.args.specialize_ratio:
+            land = self.fortresses[fid].get("land_type", "Default")
+            options = self.world["terrain_build_options"]
+            new_type = self.rng.choice(options.get(land) or options.get("Default") or ["Keep"])
+            await sio.emit("specialize_fortress", {"id": fid, "type": new_type})
+            self.stats.specializes_sent += 1
+        else:
+            neighbours = self.world["adj"].get(fid) or []
+            if not neighbours:
+                return
+            self.pending_moves[fid] = time.perf_counter()
+            await sio.emit("submit_move", {"source": fid, "target": str(self.rng.choice(neighbours))})
+            self.stats.moves_sent += 1
+
+    async def run(self, deadline):
+        import aiohttp
+        import socketio
+
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as http:
+            await self.authenticate(http)
+            cookies = "; ".join(f"{c.key}={c.value}" for c in http.cookie_jar)
+
+            sio = socketio.AsyncClient(reconnection=False)
+            sio.on("fortress_frame", self.on_fortress_frame)
+            sio.on("update_map", self.on_update_map)
+            sio.on("face_deltas", self.on_face_deltas)
+            sio.on("update_face_colors", self.on_owner_names)
+            sio.on("focus_camera", self.count_bytes)
+            await sio.connect(self.args.url, headers={"Cookie": cookies}, transports=["websocket"])
+            try:
+                while time.perf_counter() < deadline:
+                    await asyncio.sleep(self.rng.expovariate(1.0 / self.args.action_interval))
+                    await self.act(sio)
+            finally:
+                await sio.disconnect()
+
+
+async def sample_server(pid, deadline, samples):
+    """CPU and RSS summed over the server and its child processes (Socket.IO workers, etc.)."""
+    import psutil
+
+    proc = psutil.Process(pid)
+    proc.cpu_percent(None)
+    # cpu_percent measures since the previous call on the same Process object, so children are kept
+    children = {}
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(1.0)
+        cpu = proc.cpu_percent(None)
+        rss = proc.memory_info().rss
+        seen = {}
+        for child in proc.children(recursive=True):
+            child = children.get(child.pid, child)
+            try:
+                cpu += child.cpu_percent(None)  # 0.0 on a child's first sample
+                rss += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+            seen[child.pid] = child
+        children = seen
+        samples.append((cpu, rss))
+
+
+async def run_load(args):
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + args.ramp + args.duration
+    players = [SimulatedPlayer(i, args, stats) for i in range(args.clients)]
+    server_samples = []
+
+    async def start_player(player):
+        await asyncio.sleep(args.ramp * player.idx / max(1, args.clients))
+        try:
+            await player.run(deadline)
+        except Exception as e:
+            stats.errors += 1
+            print(f"[LOAD] client {player.idx} failed: {e}")
+
+    tasks = [start_player(p) for p in players]
+    if args.server_pid:
+        tasks.append(sample_server(args.server_pid, deadline, server_samples))
+    await asyncio.gather(*tasks)
+    return report(args, stats, server_samples, time.perf_counter() - started)
+
+
+def report(args, stats, server_samples, elapsed):
+    fan_out = []
+    for arrivals in stats.tick_arrivals.values():
+        first = min(arrivals)
+        fan_out.extend(t - first for t in arrivals)
+    per_client = list(stats.bytes_received.values())
+
+    result = {
+        "clients": args.clients,
+        "errors": stats.errors,
+        "elapsed_s": round(elapsed, 1),
+        "moves_sent": stats.moves_sent,
+        "specializes_sent": stats.specializes_sent,
+        "tick_interval_ms": {
+            "target": TICK_RATE * 1000,
+            "mean": statistics.mean(stats.frame_gaps) * 1000 if stats.frame_gaps else None,
+            "jitter_stdev": statistics.pstdev(stats.frame_gaps) * 1000 if stats.frame_gaps else None,
+            **{k: v * 1000 if v is not None else None for k, v in percentiles(stats.frame_gaps).items()},
+        },
+        "move_latency_ms": {k: v * 1000 if v is not None else None for k, v in percentiles(stats.move_latencies).items()},
+        "broadcast_latency_ms": {k: v * 1000 if v is not None else None for k, v in percentiles(stats.broadcast_latencies).items()},
+        "broadcast_fan_out_ms": {k: v * 1000 if v is not None else None for k, v in percentiles(fan_out).items()},
+        "bytes_per_client": {
+            "mean": statistics.mean(per_client) if per_client else 0,
+            "per_second": (statistics.mean(per_client) / elapsed) if per_client else 0,
+        },
+    }
+    if server_samples:
+        cpu = [c for c, _ in server_samples]
+        result["server"] = {
+            "cpu_percent_mean": statistics.mean(cpu),
+            "cpu_percent_max": max(cpu),
+            "rss_mb_max": max(r for _, r in server_samples) / 2 ** 20,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a Valhalla server with simulated players.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic after the ramp")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which clients connect")
+    parser.add_argument("--action-interval", type=float, default=2.0, help="Mean seconds between a client's commands")
+    parser.add_argument("--specialize-ratio", type=float, default=0.1)
+    parser.add_argument("--prefix", default="load", help="Username/email prefix for the simulated accounts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-pid", type=int, help="Sample CPU and RSS of this process and its children (needs psutil)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args))
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Valhalla Persistence Engine: MongoDB checkpoints of the running match.
+The tick only marks fortresses, sectors and edges dirty and copies them into
+a write batch; a background writer owns all database I/O so the tick never
+waits on Mongo. Occasional full snapshots bound how much a restore replays.
+"""
+import queue
+import random
+import threading
+import time
+import uuid
+from config import ICO_SUBDIVISIONS, CHECKPOINT_INTERVAL_TICKS, FULL_SNAPSHOT_EVERY_CHECKPOINTS, FORTRESS_STORAGE
+import world_engine
+
+META_ID = "current"
+
+_write_queue = queue.Queue()
+# Set by the writer when a batch fails; the next checkpoint is then a full snapshot
+_full_requested = threading.Event()
+_needs_full = False
+
+
+def new_dirty_sets():
+    return {"fortresses": set(), "sectors": set(), "edges": set()}
+
+
+def mark_dirty(game_state, kind, key):
+    """Flags one fortress id, face id or edge key for the next incremental checkpoint.
+    Changed fortresses are also queued for the next client fortress frame."""
+    dirty = game_state.get("dirty")
+    if dirty is not None:
+        dirty[kind].add(str(key))
+    if kind == "fortresses":
+        game_state.setdefault("frame_fortresses", set()).add(str(key))
+
+
+def start_new_match(game_state, match_id=None):
+    """Gives freshly generated state a match id and forces a full snapshot at the next checkpoint."""
+    game_state["match_id"] = match_id or uuid.uuid4().hex
+    game_state["tick"] = 0
+    game_state["dirty"] = new_dirty_sets()
+    game_state["checkpoints_since_full"] = None
+
+
+# --- Document builders (run under the game lock, so they copy anything mutable) ---
+
+def _fortress_doc(game_state, fid):
+    fort = game_state["fortresses"].stored()[fid]
+    doc = dict(fort)
+    doc["paths"] = list(fort['paths'])
+    doc["routes"] = dict(fort.get('routes', {}))
+    doc["neighbor_terrains"] = list(fort.get('neighbor_terrains', []))
+    doc["_id"] = fid
+    doc["match_id"] = game_state["match_id"]
+    return doc
+
+
+def _edge_doc(game_state, key):
+    edge = game_state["edges"][key]
+    return {
+        "_id": key, "match_id": game_state["match_id"],
+        "u": edge["u"], "v": edge["v"],
+        "packets": [dict(p) for p in edge["packets"]],
+        "battle_point": edge.get("battle_point")
+    }
+
+
+def _sector_doc(game_state, face_id):
+    return {
+        "_id": face_id, "match_id": game_state["match_id"],
+        "owner": game_state["sector_owners"].get(face_id),
+        "color": game_state["face_colors"][int(face_id)]
+    }
+
+
+def _meta_doc(game_state):
+    return {
+        "_id": META_ID, "match_id": game_state["match_id"],
+        "subdivisions": ICO_SUBDIVISIONS,
+        "face_terrain": list(game_state["face_terrain"]),
+        "sanctuaries": {k: dict(v) for k, v in game_state["sanctuaries"].items()} if "sanctuaries" in game_state else None,
+        "tick": game_state.get("tick", 0),
+        "seed": game_state.get("seed"),
+        "worldgen": game_state.get("worldgen"),
+        "rng_state": _rng_state(game_state),
+        "spawn_faces": list(game_state["spawn_index"]["faces"]) if "spawn_index" in game_state else None,
+        "saved_at": time.time()
+    }
+
+
+def _rng_state(game_state):
+    rng = game_state.get("rng")
+    if rng is None:
+        return None
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def build_checkpoint(game_state, full=False):
+    """Copies dirty (or all) match state into a write batch and clears the dirty sets."""
+    dirty = game_state.get("dirty") or new_dirty_sets()
+    game_state["dirty"] = new_dirty_sets()
+    if full:
+        # Untouched neutral fortresses and never-owned faces are rebuilt on restore, not stored
+        fortress_ids = list(game_state["fortresses"].stored())
+        edge_keys = game_state["edges"].keys()
+        sector_ids = list(game_state["sector_owners"])
+    else:
+        fortress_ids, edge_keys, sector_ids = dirty["fortresses"], dirty["edges"], dirty["sectors"]
+    return {
+        "full": full,
+        "match_id": game_state["match_id"],
+        "meta": _meta_doc(game_state),
+        "fortresses": [_fortress_doc(game_state, fid) for fid in fortress_ids if fid in game_state["fortresses"].stored()],
+        "edges": [_edge_doc(game_state, key) for key in edge_keys if key in game_state["edges"]],
+        "sectors": [_sector_doc(game_state, face_id) for face_id in sector_ids]
+    }
+
+
+def maybe_checkpoint(game_state):
+    """Called once per tick under the lock. Queues a batch every CHECKPOINT_INTERVAL_TICKS."""
+    if "match_id" not in game_state:
+        return False
+    since_full = game_state.get("checkpoints_since_full")
+    if since_full is not None and game_state.get("tick", 0) % CHECKPOINT_INTERVAL_TICKS != 0:
+        return False
+    full = since_full is None or since_full + 1 >= FULL_SNAPSHOT_EVERY_CHECKPOINTS or _full_requested.is_set()
+    if full:
+        _full_requested.clear()
+    game_state["checkpoints_since_full"] = 0 if full else since_full + 1
+    _write_queue.put(build_checkpoint(game_state, full=full))
+    return True
+
+
+# --- Writer (runs off the game lock) ---
+
+def write_checkpoint(db, batch):
+    """Upserts one batch. Full snapshots also purge documents left over from older matches.
+    The meta is flagged pending before any document changes and replaced last, so a write
+    that dies halfway leaves a checkpoint restore_match refuses."""
+    from pymongo import ReplaceOne
+
+    db.match_meta.update_one({"_id": META_ID}, {"$set": {"pending_tick": batch["meta"]["tick"]}}, upsert=True)
+    for name in ("fortresses", "edges", "sectors"):
+        docs = batch[name]
+        if docs:
+            db["match_" + name].bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False)
+    db.match_meta.replace_one({"_id": META_ID}, batch["meta"], upsert=True)
+    if batch["full"]:
+        for name in ("fortresses", "edges", "sectors"):
+            db["match_" + name].delete_many({"match_id": {"$ne": batch["match_id"]}})
+
+
+def write_queued(db, batch):
+    """Writes one batch from the queue. A failed batch's dirty keys are gone, so later
+    incrementals are dropped until the full snapshot it requests has been written."""
+    global _needs_full
+    if _needs_full and not batch["full"]:
+        return
+    try:
+        write_checkpoint(db, batch)
+        _needs_full = False
+    except Exception as e:
+        print(f"[PERSISTENCE ERROR] Checkpoint write failed, next checkpoint will be full: {e}")
+        _needs_full = True
+        _full_requested.set()
+
+
+def writer_loop(db):
+    """Background task: drains queued checkpoints forever."""
+    while True:
+        write_queued(db, _write_queue.get())
+
+
+def flush(db):
+    """Writes every queued batch synchronously (shutdown hooks and tests)."""
+    while True:
+        try:
+            batch = _write_queue.get_nowait()
+        except queue.Empty:
+            return
+        write_checkpoint(db, batch)
+
+
+def ensure_indexes(db):
+    for name in ("fortresses", "edges", "sectors"):
+        db["match_" + name].create_index("match_id")
+
+
+# --- Restore ---
+
+def restore_match(db):
+    """Rebuilds match state from the latest checkpoint, or returns None if there is nothing usable."""
+    import fortress_engine
+
+    meta = db.match_meta.find_one({"_id": META_ID})
+    if not meta or meta.get("subdivisions") != ICO_SUBDIVISIONS or meta.get("worldgen") != world_engine.WORLDGEN_VERSION:
+        return None
+    if meta.get("pending_tick") is not None:
+        print(f"[PERSISTENCE] Checkpoint for tick {meta['pending_tick']} was only partly written; not restoring.")
+        return None
+    match_id = meta["match_id"]
+
+    vertices, faces = world_engine.create_ico_sphere(ICO_SUBDIVISIONS)
+    if len(meta["face_terrain"]) != len(faces):
+        return None
+    state = world_engine.build_world_from_terrain(vertices, faces, meta["face_terrain"])
+
+    stored = {}
+    for doc in db.match_fortresses.find({"match_id": match_id}):
+        fid = doc.pop("_id")
+        doc.pop("match_id", None)
+        stored[fid] = doc
+    vertex_faces = fortress_engine.build_vertex_faces(state)
+    fortresses = fortress_engine.FortressMap(stored, meta.get("seed"), vertex_faces, state["face_terrain"])
+    if FORTRESS_STORAGE == "eager":
+        fortresses.materialize_all()
+
+    for doc in db.match_edges.find({"match_id": match_id}):
+        edge = state["edges"].get(doc["_id"])
+        if edge is None:
+            continue
+        edge["packets"] = doc.get("packets", [])
+        if doc.get("battle_point") is not None:
+            edge["battle_point"] = doc["battle_point"]
+
+    rng = random.Random()
+    if meta.get("rng_state"):
+        version, internal, gauss_next = meta["rng_state"]
+        rng.setstate((version, tuple(internal), gauss_next))
+
+    sector_owners = {}
+    for doc in db.match_sectors.find({"match_id": match_id}):
+        sector_owners[doc["_id"]] = doc.get("owner")
+        state["face_colors"][int(doc["_id"])] = doc["color"]
+
+    state.update({
+        "fortresses": fortresses,
+        "sector_owners": sector_owners,
+        "dominance_cache": {},
+        "match_id": match_id,
+        "rng": rng,
+        "seed": meta.get("seed"),
+        "worldgen": meta["worldgen"],
+        "spawn_faces": meta.get("spawn_faces"),
+        "tick": meta.get("tick", 0),
+        "dirty": new_dirty_sets(),
+        "checkpoints_since_full": 0
+    })
+    if meta.get("sanctuaries") is not None:
+        state["sanctuaries"] = meta["sanctuaries"]
+    return state
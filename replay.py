@@ -0,0 +1,79 @@
+"""
+Headless replay of a recorded match log (see event_log.py).
+
+    python replay.py match_logs/<match_id>.vlog
+    python replay.py match_logs/<match_id>.vlog --profile
+    python replay.py match_logs/<match_id>.vlog --from-checkpoint mongodb://localhost:27017/valhalla_db
+
+Runs the engines without Flask or Socket.IO so production matches can be
+re-simulated and profiled offline.
+"""
+import argparse
+import cProfile
+import pstats
+import time
+import event_log
+import persistence_engine
+import simulation_engine
+
+
+def load_checkpoint(mongo_uri, match_id):
+    from pymongo import MongoClient
+
+    db = MongoClient(mongo_uri).get_default_database()
+    game_state = persistence_engine.restore_match(db)
+    if not game_state or game_state["match_id"] != match_id:
+        raise SystemExit(f"No usable checkpoint for match {match_id} at {mongo_uri}")
+    simulation_engine.rebuild_state_indexes(game_state)
+    return game_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a Valhalla match log headlessly.")
+    parser.add_argument("log", help="Path to a .vlog file")
+    parser.add_argument("--from-checkpoint", metavar="MONGO_URI", help="Start from the match's last MongoDB checkpoint")
+    parser.add_argument("--until-tick", type=int, help="Stop once this tick has been simulated")
+    parser.add_argument("--profile", action="store_true", help="Run under cProfile and print the hottest functions")
+    args = parser.parse_args()
+
+    events, _ = event_log.read_events(args.log)
+    if not events or events[0][0] != event_log.EV_MATCH_START:
+        raise SystemExit("Log does not begin with a match start record")
+    match_id = events[0][1]["match_id"]
+
+    if args.from_checkpoint:
+        game_state = load_checkpoint(args.from_checkpoint, match_id)
+        events = event_log.events_after_checkpoint(events, game_state["tick"])
+        if events is None:
+            raise SystemExit(f"Checkpoint marker for tick {game_state['tick']} is not in the log")
+    else:
+        game_state = {}
+
+    if args.until_tick is not None:
+        for idx, (ev_type, fields) in enumerate(events):
+            if ev_type == event_log.EV_TICK and fields["tick"] > args.until_tick:
+                events = events[:idx]
+                break
+
+    start_tick = game_state.get("tick", 0)
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    event_log.replay(game_state, events)
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    ticks = game_state["tick"] - start_tick
+    owners = {owner: len(fids) for owner, fids in game_state["owner_index"].items()}
+    print(f"[REPLAY] Match {match_id}: {len(events)} events, ticks {start_tick} -> {game_state['tick']}")
+    print(f"[REPLAY] {elapsed:.3f}s total, {1000.0 * elapsed / max(ticks, 1):.3f} ms/tick")
+    print(f"[REPLAY] Fortresses held: {owners}")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Valhalla Routing Engine: Multi-hop path planning across the road network.
+Shortest-path trees are cached per (source, owner) and dropped whenever
+ownership or roads change, so repeated route queries are dictionary lookups.
+"""
+import heapq
+from config import ROUTE_TERRAIN_COSTS, ROUTE_NEUTRAL_COST, ROUTE_HOSTILE_COST
+
+
+def invalidate_routes(game_state):
+    """Drops every cached shortest-path tree (call after captures, spawns or new roads)."""
+    game_state["route_cache"] = {}
+
+
+def get_vertex_cost(fort, owner):
+    """Cost of stepping onto a fortress: roughest touching terrain plus an ownership penalty."""
+    terrain_cost = max((ROUTE_TERRAIN_COSTS.get(t, 1.0) for t in fort.get("neighbor_terrains", [])), default=1.0)
+    if fort['owner'] == owner:
+        return terrain_cost
+    if not fort['owner']:
+        return terrain_cost + ROUTE_NEUTRAL_COST
+    return terrain_cost + ROUTE_HOSTILE_COST
+
+
+def get_path_tree(game_state, source_id, owner):
+    """Dijkstra from source_id. Only the owner's fortresses relay packets, so all others are leaves."""
+    cache = game_state.setdefault("route_cache", {})
+    key = (int(source_id), owner)
+    tree = cache.get(key)
+    if tree is not None:
+        return tree
+
+    src = int(source_id)
+    fortresses = game_state["fortresses"]
+    adj = game_state["adj"]
+    dist = {src: 0.0}
+    first_hop = {src: None}
+    parent = {src: None}
+    heap = [(0.0, src)]
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if u != src and fortresses.owner(str(u)) != owner:
+            continue
+        for v in adj.get(u, []):
+            nd = d + get_vertex_cost(fortresses.peek(str(v)), owner)
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                parent[v] = u
+                first_hop[v] = v if u == src else first_hop[u]
+                heapq.heappush(heap, (nd, v))
+
+    tree = {"dist": dist, "parent": parent, "first_hop": first_hop}
+    cache[key] = tree
+    return tree
+
+
+def find_route(game_state, source_id, target_id, owner):
+    """Returns the vertex list from source to target (inclusive), or None if unreachable."""
+    src, tgt = int(source_id), int(target_id)
+    if src == tgt:
+        return None
+    parent = get_path_tree(game_state, src, owner)["parent"]
+    if tgt not in parent:
+        return None
+    route = [tgt]
+    while route[-1] != src:
+        route.append(parent[route[-1]])
+    route.reverse()
+    return route
+
+
+def next_hop(game_state, current_id, destination_id, owner):
+    """First vertex to send packets toward on the way to destination_id, or None."""
+    if int(current_id) == int(destination_id):
+        return None
+    return get_path_tree(game_state, current_id, owner)["first_hop"].get(int(destination_id))
+
+
+def nearest_target(game_state, source_id, owner):
+    """Cheapest fortress reachable from source_id that the owner does not hold."""
+    tree = get_path_tree(game_state, source_id, owner)
+    fortresses = game_state["fortresses"]
+    best, best_dist = None, float('inf')
+    for v, d in tree["dist"].items():
+        if d < best_dist and fortresses.owner(str(v)) != owner:
+            best, best_dist = v, d
+    return best
+
+
+def add_route(game_state, fort, target_id):
+    """Points one of fort's paths at target_id via its first hop. Returns True if anything changed.
+    Adjacent targets stay direct paths; a first hop already in use (direct or routed) is left alone."""
+    route = find_route(game_state, fort['id'], target_id, fort['owner'])
+    if not route:
+        return False
+    first, dest = str(route[1]), str(route[-1])
+    routes = fort.setdefault('routes', {})
+    if first in fort['paths'] or len(fort['paths']) >= fort['tier']:
+        return False
+    fort['paths'].append(first)
+    if first != dest:
+        routes[first] = dest
+    return True
+
+
+def toggle_route(game_state, fort, target_id):
+    """Removes the path or route to target_id if fort already has one, otherwise adds it."""
+    dest = str(target_id)
+    routes = fort.setdefault('routes', {})
+    if dest in fort['paths'] and dest not in routes:
+        fort['paths'].remove(dest)
+        return True
+    for first, routed_dest in list(routes.items()):
+        if routed_dest == dest:
+            del fort['routes'][first]
+            if first in fort['paths']:
+                fort['paths'].remove(first)
+            return True
+    return add_route(game_state, fort, target_id)
@@ -0,0 +1,163 @@
+"""
+Valhalla Simulation Engine: the tick pipeline and the player commands that mutate it.
+Socket handlers and the headless replay tool both go through these functions,
+so a recorded match re-runs exactly as it was played.
+"""
+import random
+import secrets
+import world_engine
+import fortress_engine
+import combat_engine
+import routing_engine
+import persistence_engine
+from ai_engine import process_ai_turn
+from config import STARTING_UNITS_POOL, TERRAIN_BUILD_OPTIONS
+
+AI_NAME = "Gorgon"
+
+
+def rebuild_state_indexes(game_state):
+    """Recomputes derived lookups after the fortress map is replaced (new world, restore)."""
+    game_state["owner_index"] = fortress_engine.build_owner_index(game_state["fortresses"])
+    fortress_engine.build_spawn_index(game_state, game_state.pop("spawn_faces", None))
+    routing_engine.invalidate_routes(game_state)
+
+
+def new_match(game_state, seed=None, match_id=None):
+    """Generates a fresh world from seed. Every random draw of the match comes from game_state['rng']."""
+    if seed is None:
+        seed = secrets.randbits(63)
+    rng = random.Random(seed)
+    game_state["rng"] = rng
+    game_state["seed"] = seed
+    game_state.update(world_engine.generate_game_world(rng))
+    game_state["fortresses"] = fortress_engine.initialize_fortresses(game_state)
+    game_state["sector_owners"] = {}
+    game_state["dominance_cache"] = {}
+    game_state["dirty_faces"] = set()
+    game_state["frame_fortresses"] = set()
+    rebuild_state_indexes(game_state)
+    persistence_engine.start_new_match(game_state, match_id)
+    return seed
+
+
+def run_tick(game_state):
+    """Advances the world one tick. Returns True if any fortress or packet changed.
+    Sector colour changes are picked up separately through combat_engine.pop_face_deltas."""
+    map_changed = False
+
+    # 1. Sector Dominance
+    combat_engine.process_sector_dominance(game_state)
+
+    # 2. AI Logic
+    process_ai_turn(game_state)
+
+    # 3. Fortress Production
+    if fortress_engine.process_fortress_production(game_state):
+        map_changed = True
+
+    # 4. Fortress Upgrades
+    if fortress_engine.process_fortress_upgrades(game_state):
+        map_changed = True
+
+    # 5. Combat / Attack Paths
+    if combat_engine.process_combat_flows(game_state):
+        map_changed = True
+
+    game_state["tick"] = game_state.get("tick", 0) + 1
+    return map_changed
+
+
+def _claim_sector(game_state, face_idx, owner, race):
+    v1, v2, v3 = [str(x) for x in game_state["faces"][face_idx]]
+    units = int(STARTING_UNITS_POOL // 3)
+    for vid in [v1, v2, v3]:
+        fortress_engine.set_fortress_owner(game_state, vid, owner)
+        game_state["fortresses"].materialize(vid).update({
+            "units": units,
+            "race": race,
+            "is_capital": True,
+            "special_active": True,
+            "tier": 1,
+            "paths": [],
+            "routes": {},
+            "type": "Keep"
+        })
+    game_state["sector_owners"][str(face_idx)] = owner
+    game_state["face_colors"][face_idx] = combat_engine.get_sector_color(game_state, face_idx, owner)
+    combat_engine.mark_face_dirty(game_state, face_idx)
+    persistence_engine.mark_dirty(game_state, "sectors", face_idx)
+    routing_engine.invalidate_routes(game_state)
+
+
+def spawn_ai_sector(game_state):
+    """Gives the AI a home sector if it holds nothing."""
+    if fortress_engine.get_owned_fortress_ids(game_state, AI_NAME):
+        return
+
+    i = fortress_engine.sample_spawn_face(game_state, ["Deep Sea", "Sea", "Mountain"])
+    if i is not None:
+        _claim_sector(game_state, i, AI_NAME, "Orc")
+
+
+def join_player(game_state, username):
+    """Spawns the AI if needed and a home sector for a new player. Returns the camera focus point."""
+    spawn_ai_sector(game_state)
+
+    existing_forts = fortress_engine.get_owned_fortress_ids(game_state, username)
+    if existing_forts:
+        vid = min(int(fid) for fid in existing_forts)
+        return game_state["vertices"][vid]
+
+    i = fortress_engine.sample_spawn_face(game_state, ["Deep Sea", "Sea"])
+    if i is None:
+        return None
+
+    _claim_sector(game_state, i, username, "Human")
+
+    coords = [game_state["vertices"][v] for v in game_state["faces"][i]]
+    cx = float(sum(c[0] for c in coords) / 3)
+    cy = float(sum(c[1] for c in coords) / 3)
+    cz = float(sum(c[2] for c in coords) / 3)
+    return [cx, cy, cz]
+
+
+def apply_move(game_state, username, src_id, tgt_id):
+    """Toggles a path (or multi-hop route) from src to tgt. Returns True if the map changed."""
+    src_id, tgt_id = str(src_id), str(tgt_id)
+    if not game_state["fortresses"].has(src_id) or not game_state["fortresses"].has(tgt_id):
+        return False
+    if game_state["fortresses"].owner(src_id) != username:
+        return False
+    src_fort = game_state["fortresses"].materialize(src_id)
+
+    # Non-adjacent targets get a multi-hop route; packets relay at each owned waypoint
+    if int(tgt_id) not in game_state["adj"].get(int(src_id), []):
+        if not routing_engine.toggle_route(game_state, src_fort, tgt_id):
+            return False
+    elif tgt_id in src_fort['paths']:
+        src_fort['paths'].remove(tgt_id)
+        src_fort.setdefault('routes', {}).pop(tgt_id, None)
+    else:
+        if len(src_fort['paths']) < src_fort['tier']:
+            src_fort['paths'].append(tgt_id)
+
+    persistence_engine.mark_dirty(game_state, "fortresses", src_id)
+    return True
+
+
+def apply_specialize(game_state, username, fid, new_type):
+    """Converts an owned fortress to new_type if its terrain allows. Returns True on change."""
+    fid = str(fid)
+    if not game_state["fortresses"].has(fid):
+        return False
+    if game_state["fortresses"].owner(fid) != username:
+        return False
+    fort = game_state["fortresses"].materialize(fid)
+
+    allowed = TERRAIN_BUILD_OPTIONS.get(fort.get('land_type', 'Plain'), ["Keep"])
+    if new_type not in allowed:
+        return False
+    fort['type'] = new_type
+    persistence_engine.mark_dirty(game_state, "fortresses", fid)
+    return True
@@ -1,3 +1,36 @@
+import { decode as decodeMsgpack } from 'https://cdn.skypack.dev/@msgpack/msgpack@2.8.0';
+
+// Field order of binary events; must match wire_engine.EVENT_FIELDS on the server
+const WIRE_FIELDS = {
+    fortress_frame: ['tick', 'ids', 'owners', 'units', 'tiers', 'types', 'path_counts', 'path_targets', 'owner_names',
+                     'tick_frame', 'sent_at'],
+    face_deltas: ['deltas', 'owner_names']
+};
+
+// JSON payloads pass through; MessagePack arrays are unpacked into the same object shape
+function decodeWire(event, payload) {
+    if (!(payload instanceof ArrayBuffer) && !ArrayBuffer.isView(payload)) return payload;
+    const row = decodeMsgpack(payload);
+    const decoded = {};
+    WIRE_FIELDS[event].forEach((name, i) => { decoded[name] = row[i]; });
+    return decoded;
+}
+
+// The server only stores fortresses that have been touched; untouched neutral garrisons
+// arrive as per-vertex columns and are filled in here for every id the map lacks.
+// This is O(vertices) per full sync, as before: the renderer draws every fortress anyway
+function expandFortresses(fortresses, neutral, typeNames) {
+    if (!neutral) return fortresses;
+    for (let id = 0; id < neutral.units.length; id++) {
+        if (fortresses[id]) continue;
+        fortresses[id] = {
+            id: id, owner: null, units: neutral.units[id], race: 'Neutral', is_capital: false,
+            tier: 1, paths: [], routes: {}, type: typeNames[neutral.types[id]]
+        };
+    }
+    return fortresses;
+}
+
 export class GameClient {
     constructor(callbacks) {
         console.log("[CLIENT DEBUG] Initializing Socket.IO...");
@@ -18,7 +51,8 @@ export class GameClient {
             faces: [],
             terrain_build_options: {}, 
             fortress_types: {},
-            sector_owners: {}
+            sector_owners: {},
+            owner_names: {}
         };
 
         this.initSocket();
@@ -39,6 +73,7 @@ export class GameClient {
                 })
                 .then(data => {
                     console.log("[CLIENT DEBUG] GameState Data Received. Fortress Count:", Object.keys(data.fortresses).length);
+                    data.fortresses = expandFortresses(data.fortresses, data.neutral_garrisons, data.fortress_type_names || []);
                     this.gameState = data;
                     this.isStateLoaded = true;
                     
@@ -55,6 +90,10 @@ export class GameClient {
                                 this.handleUpdateMap(event.payload);
                             } else if (event.type === 'update_face_colors') {
                                 this.handleUpdateFaceColors(event.payload);
+                            } else if (event.type === 'fortress_frame') {
+                                this.handleFortressFrame(event.payload);
+                            } else if (event.type === 'face_deltas') {
+                                this.handleFaceDeltas(event.payload);
                             } else if (event.type === 'focus_camera') {
                                 this.handleFocusCamera(event.payload);
                             }
@@ -80,12 +119,21 @@ export class GameClient {
             console.error("[CLIENT ERROR] Socket Connection Failed:", err.message);
         });
 
-        this.socket.on('update_map', (fortresses) => {
+        this.socket.on('update_map', (payload) => {
+            if (!this.isStateLoaded) {
+                this.eventQueue.push({ type: 'update_map', payload: payload });
+                return;
+            }
+            this.handleUpdateMap(payload);
+        });
+
+        this.socket.on('fortress_frame', (payload) => {
+            const frame = decodeWire('fortress_frame', payload);
             if (!this.isStateLoaded) {
-                this.eventQueue.push({ type: 'update_map', payload: fortresses });
+                this.eventQueue.push({ type: 'fortress_frame', payload: frame });
                 return;
             }
-            this.handleUpdateMap(fortresses);
+            this.handleFortressFrame(frame);
         });
 
         this.socket.on('update_face_colors', (payload) => {
@@ -96,6 +144,15 @@ export class GameClient {
             this.handleUpdateFaceColors(payload);
         });
         
+        this.socket.on('face_deltas', (raw) => {
+            const payload = decodeWire('face_deltas', raw);
+            if (!this.isStateLoaded) {
+                this.eventQueue.push({ type: 'face_deltas', payload: payload });
+                return;
+            }
+            this.handleFaceDeltas(payload);
+        });
+        
         this.socket.on('focus_camera', (data) => {
             if (!this.isStateLoaded) {
                 this.eventQueue.push({ type: 'focus_camera', payload: data });
@@ -105,8 +162,9 @@ export class GameClient {
         });
     }
 
-    handleUpdateMap(fortresses) {
+    handleUpdateMap(payload) {
         if (Math.random() < 0.1) console.log("[CLIENT DEBUG] update_map processed.");
+        const fortresses = expandFortresses(payload.fortresses, payload.neutral_garrisons, this.gameState.fortress_type_names || []);
         this.gameState.fortresses = fortresses;
         if (this.callbacks.onMapUpdate) {
             this.callbacks.onMapUpdate(fortresses);
@@ -114,13 +172,42 @@ export class GameClient {
         document.dispatchEvent(new CustomEvent('uiRefreshRequired'));
     }
 
+    // frame is columnar: entry k of every array describes fortress frame.ids[k]
+    handleFortressFrame(frame) {
+        if (!this.gameState.owner_names) this.gameState.owner_names = {};
+        Object.assign(this.gameState.owner_names, frame.owner_names || {});
+        const typeNames = this.gameState.fortress_type_names || [];
+
+        const changed = [];
+        let pathOffset = 0;
+        frame.ids.forEach((id, k) => {
+            const fort = this.gameState.fortresses[id] || (this.gameState.fortresses[id] = { id: id });
+            const ownerId = frame.owners[k];
+            const pathCount = frame.path_counts[k];
+            fort.owner = ownerId ? this.gameState.owner_names[ownerId] : null;
+            fort.units = frame.units[k];
+            fort.tier = frame.tiers[k];
+            fort.type = typeNames[frame.types[k]] || fort.type;
+            fort.paths = frame.path_targets.slice(pathOffset, pathOffset + pathCount).map(String);
+            pathOffset += pathCount;
+            changed.push(fort);
+        });
+
+        if (this.callbacks.onMapUpdate) {
+            this.callbacks.onMapUpdate(changed);
+        }
+        document.dispatchEvent(new CustomEvent('uiRefreshRequired'));
+    }
+
     handleUpdateFaceColors(payload) {
         console.log("[CLIENT DEBUG] update_face_colors processed.");
         let colors = payload;
         if (payload && payload.colors) {
             colors = payload.colors;
             this.gameState.sector_owners = payload.owners;
+            if (payload.owner_names) this.gameState.owner_names = payload.owner_names;
         }
+        this.gameState.face_colors = colors;
         
         if (this.callbacks.onColorUpdate) {
             this.callbacks.onColorUpdate(colors, this.gameState.sector_owners, this.username);
@@ -128,6 +215,24 @@ export class GameClient {
         document.dispatchEvent(new CustomEvent('uiRefreshRequired'));
     }
 
+    handleFaceDeltas(payload) {
+        if (!this.gameState.owner_names) this.gameState.owner_names = {};
+        Object.assign(this.gameState.owner_names, payload.owner_names || {});
+
+        const deltas = payload.deltas;
+        for (let k = 0; k + 2 < deltas.length; k += 3) {
+            const faceIdx = deltas[k];
+            const ownerId = deltas[k + 2];
+            if (this.gameState.face_colors) this.gameState.face_colors[faceIdx] = deltas[k + 1];
+            this.gameState.sector_owners[faceIdx] = ownerId ? this.gameState.owner_names[ownerId] : null;
+        }
+
+        if (this.callbacks.onFaceDeltas) {
+            this.callbacks.onFaceDeltas(deltas);
+        }
+        document.dispatchEvent(new CustomEvent('uiRefreshRequired'));
+    }
+
     handleFocusCamera(data) {
         console.log("[CLIENT DEBUG] focus_camera command processed for pos:", data.position);
         if (this.callbacks.onFocus) {
@@ -32,20 +32,21 @@ export class InputHandler {
         this.renderer.clearHoverHighlight();
 
         if (intersects.length > 0) {
-            const fortHit = intersects.find(h => h.object.parent && h.object.parent.userData?.type === 'fortress');
+            const fortHit = intersects.find(h => h.object.userData?.type === 'fortress');
             const pathHit = intersects.find(h => h.object.userData?.type === 'path');
             const worldHit = intersects.find(h => h.object.userData?.type === 'world');
 
             if (fortHit) {
-                hoverId = fortHit.object.parent.userData.id;
+                hoverId = fortHit.instanceId;
                 hoverType = "Fortress";
                 const fort = this.client.getFortress(hoverId);
                 hoverData = { type: fort.type, owner: fort.owner, units: Math.floor(fort.units) };
                 this.renderer.highlightFortressHover(hoverId);
             } else if (pathHit) {
-                hoverId = pathHit.object.userData.pathId;
+                const path = this.renderer.getPathSlot(pathHit.instanceId);
+                hoverId = path.pathId;
                 hoverType = "Road";
-                hoverData = { source: pathHit.object.userData.sourceId, target: pathHit.object.userData.targetId };
+                hoverData = { source: path.sourceId, target: path.targetId };
                 this.renderer.highlightPathHover(hoverId);
             } else if (worldHit) {
                 hoverId = worldHit.faceIndex;
@@ -69,14 +70,14 @@ export class InputHandler {
         const intersects = this.raycaster.intersectObjects(this.renderer.scene.children, true);
 
         if (intersects.length > 0) {
-            const fortHit = intersects.find(h => h.object.parent && h.object.parent.userData?.type === 'fortress');
+            const fortHit = intersects.find(h => h.object.userData?.type === 'fortress');
             const pathHit = intersects.find(h => h.object.userData?.type === 'path');
             const worldHit = intersects.find(h => h.object.userData?.type === 'world');
 
             if (fortHit) {
-                this.handleFortressClick(fortHit.object.parent.userData.id);
+                this.handleFortressClick(fortHit.instanceId);
             } else if (pathHit) {
-                this.handlePathClick(pathHit.object.userData);
+                this.handlePathClick(this.renderer.getPathSlot(pathHit.instanceId));
             } else if (worldHit) {
                 this.handleFaceClick(worldHit.faceIndex);
             }
@@ -103,11 +104,9 @@ export class InputHandler {
             if (this.selectedSourceId === id) {
                 this.deselect();
             } else {
-                // If a source is selected, clicking another fortress tries to draw a path if neighbor
-                const neighbors = this.client.gameState.adj[this.selectedSourceId] || [];
-                if (neighbors.includes(parseInt(id))) {
-                    this.client.sendMove(this.selectedSourceId, id);
-                }
+                // If a source is selected, clicking another fortress draws a path to it.
+                // Neighbours get a direct path; the server plans a multi-hop route for anything further.
+                this.client.sendMove(this.selectedSourceId, id);
                 this.ui.showFortressInfo(fort);
             }
         }
@@ -128,7 +127,9 @@ export class InputHandler {
 
     handleFaceClick(faceIdx) {
         const terrain = this.client.gameState.face_terrain ? this.client.gameState.face_terrain[faceIdx] : "Plain";
-        const owner = this.client.gameState.sector_owners ? this.client.gameState.sector_owners[faceIdx] : null;
+        // sector_owners only lists faces that have been held; a missing face is unclaimed
+        const owners = this.client.gameState.sector_owners;
+        const owner = (owners && owners[faceIdx]) || null;
         this.ui.showFaceInfo(faceIdx, terrain, owner);
         this.renderer.highlightFaceSelection(faceIdx);
     }
@@ -14,6 +14,7 @@ document.addEventListener('DOMContentLoaded', () => {
         onInit: (data) => renderer.initWorld(data.vertices, data.faces, data.face_colors),
         onMapUpdate: (forts) => renderer.updateFortresses(forts, client.username),
         onColorUpdate: (colors) => renderer.updateFaceColors(colors),
+        onFaceDeltas: (deltas) => renderer.patchFaceColors(deltas),
         onFocus: (pos) => renderer.focusCamera(pos),
         onStartSequence: (callback) => ui.startCountdown(callback)
     });
@@ -1,6 +1,8 @@
 import * as THREE from 'https://cdn.skypack.dev/three@0.136.0';
 import { OrbitControls } from 'https://cdn.skypack.dev/three@0.136.0/examples/jsm/controls/OrbitControls.js';
 
+const MAX_PATH_INSTANCES = 4000;
+
 export class GameRenderer {
     constructor(containerId) {
         this.container = document.getElementById(containerId);
@@ -10,9 +12,28 @@ export class GameRenderer {
         
         this.controls = null;
         this.sphereMesh = null;
-        this.fortressMeshes = {};
-        this.pathLines = {}; 
         this.labels = []; 
+
+        // Fortresses and path beams are instanced: one draw call each, indexed by vertex id / path slot
+        this.fortressBaseMesh = null;
+        this.fortressRoofMesh = null;
+        this.fortressPositions = [];
+        this.fortressQuats = [];
+        this.fortressScales = null;
+        this.roofColors = [];
+        this.hoveredFortress = null;
+
+        this.pathMesh = null;
+        this.fortressPaths = new Map(); // source id -> { targets, color }
+        this.pathSlots = [];
+        this.pathSlotByKey = {};
+        this.highlightedPaths = [];
+
+        this.instanceDummy = new THREE.Object3D();
+        this.instanceColor = new THREE.Color();
+        this.glowColor = new THREE.Color();
+        this.upAxis = new THREE.Vector3(0, 1, 0);
+        this.pathDirection = new THREE.Vector3();
         
         this.packetMesh = null;
         this.dummy = new THREE.Object3D();
@@ -21,6 +42,9 @@ export class GameRenderer {
         this.currentSelectedFace = null;
         this.currentHoveredFace = null;
         this.baseFaceColors = []; 
+        this.faceColor = new THREE.Color();
+        this.dirtyFaceLo = Infinity;
+        this.dirtyFaceHi = -1;
 
         this.init();
     }
@@ -57,6 +81,16 @@ export class GameRenderer {
         this.packetMesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage);
         this.scene.add(this.packetMesh);
 
+        // Unit-height beam, stretched to each path's length by its instance matrix
+        const beamMaterial = new THREE.MeshLambertMaterial({ transparent: true, opacity: 0.6 });
+        this.pathMesh = new THREE.InstancedMesh(new THREE.CylinderGeometry(0.008, 0.008, 1, 6), beamMaterial, MAX_PATH_INSTANCES);
+        this.pathMesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage);
+        this.pathMesh.setColorAt(0, this.instanceColor.setHex(0x888888));
+        this.pathMesh.count = 0;
+        this.pathMesh.frustumCulled = false;
+        this.pathMesh.userData = { type: 'path' };
+        this.scene.add(this.pathMesh);
+
         window.addEventListener('resize', () => this.onWindowResize(), false);
         this.animate();
     }
@@ -98,37 +132,44 @@ export class GameRenderer {
         const material = new THREE.MeshLambertMaterial({ vertexColors: true, flatShading: true });
         this.sphereMesh = new THREE.Mesh(geometry, material);
         this.sphereMesh.userData = { type: 'world' }; 
+        this.dirtyFaceLo = Infinity;
+        this.dirtyFaceHi = -1;
         this.scene.add(this.sphereMesh);
 
         this.initFortressVisuals(vertices);
     }
 
     initFortressVisuals(vertices) {
-        Object.values(this.fortressMeshes).forEach(m => this.scene.remove(m));
-        this.fortressMeshes = {};
+        [this.fortressBaseMesh, this.fortressRoofMesh].forEach(mesh => {
+            if (!mesh) return;
+            this.scene.remove(mesh);
+            mesh.geometry.dispose();
+            mesh.material.dispose();
+        });
         this.labels.forEach(l => {
             if (l && l.element) l.element.remove();
         });
         this.labels = [];
 
+        // One instance per vertex; the roof geometry carries its own offset so both meshes share a matrix
+        const count = vertices.length;
+        const roofGeometry = new THREE.ConeGeometry(0.05, 0.02, 6);
+        roofGeometry.translate(0, 0.02, 0);
+        this.fortressBaseMesh = new THREE.InstancedMesh(new THREE.CylinderGeometry(0.035, 0.045, 0.02, 6), new THREE.MeshLambertMaterial(), count);
+        this.fortressRoofMesh = new THREE.InstancedMesh(roofGeometry, new THREE.MeshLambertMaterial(), count);
+        this.fortressPositions = [];
+        this.fortressQuats = [];
+        this.fortressScales = new Float32Array(count).fill(1);
+        this.roofColors = new Array(count).fill(0x444444);
+        this.hoveredFortress = null;
+
         vertices.forEach((v, idx) => {
-            const group = new THREE.Group();
-            const base = new THREE.Mesh(
-                new THREE.CylinderGeometry(0.035, 0.045, 0.02, 6), 
-                new THREE.MeshLambertMaterial({ color: 0x888888 })
-            );
-            const roof = new THREE.Mesh(
-                new THREE.ConeGeometry(0.05, 0.02, 6), 
-                new THREE.MeshLambertMaterial({ color: 0x444444 })
-            );
-            roof.position.y = 0.02;
-            group.add(base);
-            group.add(roof);
-            group.position.set(v[0], v[1], v[2]);
-            group.quaternion.setFromUnitVectors(new THREE.Vector3(0, 1, 0), new THREE.Vector3(v[0], v[1], v[2]).normalize());
-            group.userData = { type: 'fortress', id: idx };
-            this.scene.add(group);
-            this.fortressMeshes[idx] = group;
+            const pos = new THREE.Vector3(v[0], v[1], v[2]);
+            this.fortressPositions[idx] = pos;
+            this.fortressQuats[idx] = new THREE.Quaternion().setFromUnitVectors(this.upAxis, pos.clone().normalize());
+            this.writeFortressMatrix(idx);
+            this.fortressBaseMesh.setColorAt(idx, this.instanceColor.setHex(0x888888));
+            this.fortressRoofMesh.setColorAt(idx, this.instanceColor.setHex(0x444444));
 
             const label = document.createElement('div');
             label.className = 'fortress-label';
@@ -140,59 +181,116 @@ export class GameRenderer {
             // Lowered from 1.15 to 1.08 to bring it closer to the planet surface
             this.labels[idx] = { element: label, pos: new THREE.Vector3(v[0], v[1], v[2]).multiplyScalar(1.08) };
         });
+
+        [this.fortressBaseMesh, this.fortressRoofMesh].forEach(mesh => {
+            mesh.userData = { type: 'fortress' };
+            mesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage);
+            mesh.frustumCulled = false;
+            this.scene.add(mesh);
+        });
+
+        this.fortressPaths.clear();
+        this.rebuildPathInstances();
+    }
+
+    writeFortressMatrix(idx) {
+        const d = this.instanceDummy;
+        d.position.copy(this.fortressPositions[idx]);
+        d.quaternion.copy(this.fortressQuats[idx]);
+        d.scale.setScalar(this.fortressScales[idx]);
+        d.updateMatrix();
+        this.fortressBaseMesh.setMatrixAt(idx, d.matrix);
+        this.fortressRoofMesh.setMatrixAt(idx, d.matrix);
+    }
+
+    paintRoof(idx) {
+        const color = this.instanceColor.setHex(this.roofColors[idx]);
+        if (idx === this.hoveredFortress) color.add(this.glowColor.setHex(0x666600));
+        this.fortressRoofMesh.setColorAt(idx, color);
+        this.fortressRoofMesh.instanceColor.needsUpdate = true;
+    }
+
+    paintPath(slot, glow = 0) {
+        const color = this.instanceColor.setHex(this.pathSlots[slot].color);
+        if (glow) color.add(this.glowColor.setHex(glow));
+        this.pathMesh.setColorAt(slot, color);
+        this.pathMesh.instanceColor.needsUpdate = true;
+    }
+
+    // Maps a raycast instanceId on the path mesh back to the path it draws
+    getPathSlot(instanceId) {
+        return this.pathSlots[instanceId];
     }
 
     highlightFortressHover(id) {
-        if (this.fortressMeshes[id]) {
-            this.fortressMeshes[id].children[1].material.emissive.setHex(0x666600);
-        }
+        const idx = Number(id);
+        if (!this.fortressRoofMesh || this.roofColors[idx] === undefined) return;
+        this.hoveredFortress = idx;
+        this.paintRoof(idx);
     }
 
     highlightPathHover(pathId, color = 0x666666) {
-        const line = this.pathLines[pathId];
-        if (line) {
-            line.material.opacity = 1.0;
-            line.material.emissive.setHex(color);
-        }
+        const slot = this.pathSlotByKey[pathId];
+        if (slot === undefined) return;
+        this.paintPath(slot, color);
+        this.highlightedPaths.push(slot);
     }
 
     highlightConnectedPaths(sourceId, color = 0x333333) {
-        const prefix = `path_${sourceId}_`;
-        Object.keys(this.pathLines).forEach(key => {
-            if (key.startsWith(prefix)) {
-                this.pathLines[key].material.opacity = 1.0;
-                this.pathLines[key].material.emissive.setHex(color);
+        this.pathSlots.forEach((path, slot) => {
+            if (path.sourceId == sourceId) {
+                this.paintPath(slot, color);
+                this.highlightedPaths.push(slot);
             }
         });
     }
 
     highlightFaceHover(faceIdx) {
+        const previous = this.currentHoveredFace;
         this.currentHoveredFace = faceIdx;
-        this.updateFaceColors(this.baseFaceColors);
+        this.repaintFaces([previous, faceIdx]);
     }
 
     highlightFaceSelection(faceIdx) {
+        const previous = this.currentSelectedFace;
         this.currentSelectedFace = faceIdx;
-        this.updateFaceColors(this.baseFaceColors);
+        this.repaintFaces([previous, faceIdx]);
     }
 
     clearHoverHighlight() {
-        Object.values(this.fortressMeshes).forEach(g => {
-            if (g.children[1] && g.children[1].material) {
-                g.children[1].material.emissive.setHex(0);
-            }
-        });
-        Object.values(this.pathLines).forEach(l => {
-            l.material.opacity = 0.6;
-            l.material.emissive.setHex(0);
-        });
+        if (this.hoveredFortress !== null) {
+            const idx = this.hoveredFortress;
+            this.hoveredFortress = null;
+            this.paintRoof(idx);
+        }
+        this.highlightedPaths.forEach(slot => this.paintPath(slot));
+        this.highlightedPaths = [];
+        const previous = this.currentHoveredFace;
         this.currentHoveredFace = null;
-        this.updateFaceColors(this.baseFaceColors);
+        this.repaintFaces([previous]);
     }
 
     clearSelectionHighlights() {
+        const previous = this.currentSelectedFace;
         this.currentSelectedFace = null;
-        this.updateFaceColors(this.baseFaceColors);
+        this.repaintFaces([previous]);
+    }
+
+    paintFace(i, colors) {
+        const color = this.faceColor.setHex(this.baseFaceColors[i]);
+        
+        if (i === this.currentSelectedFace) {
+            color.offsetHSL(0, 0, 0.3);
+        } else if (i === this.currentHoveredFace) {
+            color.offsetHSL(0, 0, 0.15);
+        }
+        
+        const base = i * 9;
+        for(let j=0; j<3; j++) {
+            colors[base + j*3] = color.r;
+            colors[base + j*3 + 1] = color.g;
+            colors[base + j*3 + 2] = color.b;
+        }
     }
 
     updateFaceColors(faceColors) {
@@ -200,29 +298,51 @@ export class GameRenderer {
         this.baseFaceColors = [...faceColors]; 
         
         const colors = this.sphereMesh.geometry.attributes.color.array;
-        faceColors.forEach((colorHex, i) => {
-            let color = new THREE.Color(colorHex);
-            
-            if (i === this.currentSelectedFace) {
-                color.offsetHSL(0, 0, 0.3);
-            } else if (i === this.currentHoveredFace) {
-                color.offsetHSL(0, 0, 0.15);
-            }
-            
-            const base = i * 9;
-            for(let j=0; j<3; j++) {
-                colors[base + j*3] = color.r;
-                colors[base + j*3 + 1] = color.g;
-                colors[base + j*3 + 2] = color.b;
-            }
+        for (let i = 0; i < faceColors.length; i++) this.paintFace(i, colors);
+        this.dirtyFaceLo = 0;
+        this.dirtyFaceHi = faceColors.length - 1;
+    }
+
+    // Repaints only the listed triangles; the upload happens once per frame in flushFaceColors
+    repaintFaces(indices) {
+        if (!this.sphereMesh) return;
+        const colors = this.sphereMesh.geometry.attributes.color.array;
+        indices.forEach(i => {
+            if (i === null || i === undefined || i < 0 || i >= this.baseFaceColors.length) return;
+            this.paintFace(i, colors);
+            this.dirtyFaceLo = Math.min(this.dirtyFaceLo, i);
+            this.dirtyFaceHi = Math.max(this.dirtyFaceHi, i);
         });
-        this.sphereMesh.geometry.attributes.color.needsUpdate = true;
     }
 
+    // Uploads just the span of the colour buffer touched since the last frame
+    flushFaceColors() {
+        if (!this.sphereMesh || this.dirtyFaceHi < 0) return;
+        const attribute = this.sphereMesh.geometry.attributes.color;
+        attribute.updateRange.offset = this.dirtyFaceLo * 9;
+        attribute.updateRange.count = (this.dirtyFaceHi - this.dirtyFaceLo + 1) * 9;
+        attribute.needsUpdate = true;
+        this.dirtyFaceLo = Infinity;
+        this.dirtyFaceHi = -1;
+    }
+
+    // deltas is the server's packed [faceIdx, colour, ownerId, ...] list
+    patchFaceColors(deltas) {
+        const touched = [];
+        for (let k = 0; k + 2 < deltas.length; k += 3) {
+            const faceIdx = deltas[k];
+            this.baseFaceColors[faceIdx] = deltas[k + 1];
+            touched.push(faceIdx);
+        }
+        this.repaintFaces(touched);
+    }
+
+    // fortressData may be the full map or just the forts in a server fortress_frame
     updateFortresses(fortressData, currentUsername) {
+        if (!this.fortressRoofMesh) return;
         Object.values(fortressData).forEach(fort => {
-            const group = this.fortressMeshes[fort.id];
-            if (!group) return;
+            const idx = Number(fort.id);
+            if (!this.fortressPositions[idx]) return;
 
             let color = 0x888888; 
             if (fort.owner) {
@@ -231,11 +351,13 @@ export class GameRenderer {
                 else color = 0x0000ff;
             }
             
-            group.children[1].material.color.setHex(color);
-            const scale = 1 + (fort.tier - 1) * 0.4;
-            group.scale.set(scale, scale, scale);
-            
-            this.updatePathVisuals(fort, color);
+            this.roofColors[idx] = color;
+            this.paintRoof(idx);
+            this.fortressScales[idx] = 1 + (fort.tier - 1) * 0.4;
+            this.writeFortressMatrix(idx);
+
+            if (fort.paths && fort.paths.length) this.fortressPaths.set(idx, { targets: fort.paths, color: color });
+            else this.fortressPaths.delete(idx);
 
             const label = this.labels[fort.id];
             if (label) {
@@ -259,45 +381,44 @@ export class GameRenderer {
                 }
             }
         });
-    }
-
-    updatePathVisuals(fort, teamColor) {
-        const keyPrefix = `path_${fort.id}_`;
-        for (const key in this.pathLines) {
-            if (key.startsWith(keyPrefix)) {
-                this.scene.remove(this.pathLines[key]);
-                delete this.pathLines[key];
-            }
-        }
-        if (!fort.paths) return;
+        this.fortressBaseMesh.instanceMatrix.needsUpdate = true;
+        this.fortressRoofMesh.instanceMatrix.needsUpdate = true;
 
-        const startPos = this.fortressMeshes[fort.id].position;
-        fort.paths.forEach(targetId => {
-            const targetMesh = this.fortressMeshes[targetId];
-            if (!targetMesh) return;
+        this.rebuildPathInstances();
+    }
 
-            const endPos = targetMesh.position;
-            const distance = startPos.distanceTo(endPos);
-            
-            const geometry = new THREE.CylinderGeometry(0.008, 0.008, distance, 6);
-            const material = new THREE.MeshLambertMaterial({ 
-                color: teamColor, 
-                transparent: true, 
-                opacity: 0.6,
-                emissive: new THREE.Color(0x000000)
+    // Rewrites the beam instances from fortressPaths; no geometry or material is created per path
+    rebuildPathInstances() {
+        if (!this.pathMesh) return;
+        this.pathSlots = [];
+        this.pathSlotByKey = {};
+        this.highlightedPaths = [];
+
+        const d = this.instanceDummy;
+        this.fortressPaths.forEach(({ targets, color }, sourceId) => {
+            const startPos = this.fortressPositions[sourceId];
+            targets.forEach(targetId => {
+                const endPos = this.fortressPositions[Number(targetId)];
+                if (!endPos || this.pathSlots.length >= MAX_PATH_INSTANCES) return;
+
+                const slot = this.pathSlots.length;
+                this.pathDirection.subVectors(endPos, startPos);
+                d.position.addVectors(startPos, endPos).multiplyScalar(0.5);
+                d.scale.set(1, this.pathDirection.length(), 1);
+                d.quaternion.setFromUnitVectors(this.upAxis, this.pathDirection.normalize());
+                d.updateMatrix();
+                this.pathMesh.setMatrixAt(slot, d.matrix);
+                this.pathMesh.setColorAt(slot, this.instanceColor.setHex(color));
+
+                const pathId = `path_${sourceId}_${targetId}`;
+                this.pathSlots.push({ pathId: pathId, sourceId: sourceId, targetId: targetId, color: color });
+                this.pathSlotByKey[pathId] = slot;
             });
-
-            const lineMesh = new THREE.Mesh(geometry, material);
-            const midpoint = new THREE.Vector3().addVectors(startPos, endPos).multiplyScalar(0.5);
-            lineMesh.position.copy(midpoint);
-            lineMesh.quaternion.setFromUnitVectors(new THREE.Vector3(0, 1, 0), new THREE.Vector3().subVectors(endPos, startPos).normalize());
-
-            const key = `path_${fort.id}_${targetId}`;
-            lineMesh.userData = { type: 'path', pathId: key, sourceId: fort.id, targetId: targetId };
-            
-            this.scene.add(lineMesh);
-            this.pathLines[key] = lineMesh;
         });
+
+        this.pathMesh.count = this.pathSlots.length;
+        this.pathMesh.instanceMatrix.needsUpdate = true;
+        this.pathMesh.instanceColor.needsUpdate = true;
     }
 
     updatePackets(edgeData) {
@@ -356,6 +477,7 @@ export class GameRenderer {
             }
         });
 
+        this.flushFaceColors();
         this.renderer.render(this.scene, this.camera);
     }
 }
\ No newline at end of file
@@ -90,7 +90,7 @@ export class UIManager {
                 }
             }
         } else if (this.currentSelection.type === 'face') {
-            const owner = this.client.gameState.sector_owners[this.currentSelection.id];
+            const owner = this.client.gameState.sector_owners[this.currentSelection.id] || null;
             this.uiOwner.innerText = owner || "UNCLAIMED";
         }
     }
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simulation_engine
+
+
+@pytest.fixture
+def game_state():
+    """A fresh default-size match on a fixed seed."""
+    state = {}
+    simulation_engine.new_match(state, seed=12345)
+    return state
+
+
+@pytest.fixture
+def play():
+    """play(game_state, ticks, moves): before every tick alice and bob each toggle a path from
+    a random owned fortress to a random vertex drawn from moves. on_move(username, source, target)
+    sees each accepted move, on_tick(game_state) runs after each tick."""
+    def run(game_state, ticks, moves, on_move=None, on_tick=None):
+        for _ in range(ticks):
+            for username in ("alice", "bob"):
+                owned = sorted(game_state["owner_index"].get(username, ()), key=int)
+                if not owned:
+                    continue
+                source, target = moves.choice(owned), moves.randrange(len(game_state["vertices"]))
+                if simulation_engine.apply_move(game_state, username, source, target) and on_move:
+                    on_move(username, source, target)
+            simulation_engine.run_tick(game_state)
+            if on_tick:
+                on_tick(game_state)
+    return run
@@ -0,0 +1,78 @@
+import auth_engine
+import cluster_engine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = auth_engine.UserCache(maxsize=4, ttl=10.0, clock=clock)
+    cache.put("a", {"username": "alice"})
+    clock.now += 9.9
+    assert cache.get("a") == {"username": "alice"}
+    clock.now += 0.1
+    assert cache.get("a") is None
+    cache.put("a", {"username": "alice2"})
+    clock.now += 5.0
+    assert cache.get("a") == {"username": "alice2"}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = auth_engine.UserCache(maxsize=2, ttl=60.0, clock=FakeClock())
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a is now the most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_invalidate_drops_entry():
+    cache = auth_engine.UserCache(maxsize=2, ttl=60.0, clock=FakeClock())
+    cache.put("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+
+    def subscribe(self, channel):
+        self.channel = channel
+
+    def listen(self):
+        for channel, data in self.client.published:
+            if channel == self.channel:
+                yield {"type": "message", "data": data}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, data):
+        self.published.append((channel, data.encode("utf-8")))
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+def test_invalidations_reach_every_process_cache():
+    client = FakeRedis()
+    publisher = cluster_engine.CommandQueue(None, client=client)
+    other_worker = auth_engine.UserCache(maxsize=4, ttl=60.0, clock=FakeClock())
+    other_worker.put("u1", {"username": None})
+    other_worker.put("u2", {"username": "bob"})
+
+    publisher.publish_user_invalidation("u1")
+    cluster_engine.CommandQueue(None, client=client).listen_user_invalidations(other_worker.invalidate)
+    assert other_worker.get("u1") is None
+    assert other_worker.get("u2") == {"username": "bob"}
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import combat_engine
+import combat_tables as ct
+
+
+def _packet(amount, pos=0.5, owner="alice", race="Human", direction=1, unit_class="Soldier"):
+    return {"amount": amount, "pos": pos, "owner": owner, "race": race, "direction": direction,
+            "unit_class": unit_class, "current_buff": 1.0,
+            "race_id": ct.race_id(race), "class_id": ct.class_id(unit_class)}
+
+
+def test_merge_stacks_folds_matching_packets_into_first():
+    first, second, third = _packet(10), _packet(5), _packet(7)
+    merged = combat_engine.merge_stacks([first, second, third])
+    assert merged == [first]
+    assert first["amount"] == 22
+
+
+def test_merge_stacks_keeps_distinct_keys_apart_in_order():
+    packets = [
+        _packet(10),
+        _packet(4, pos=0.4),
+        _packet(3, unit_class="Ranged"),
+        _packet(2, owner="bob", direction=-1),
+        _packet(6),
+    ]
+    merged = combat_engine.merge_stacks(packets)
+    assert merged == packets[:4]
+    assert [p["amount"] for p in merged] == [16, 4, 3, 2]
+
+
+def test_merged_stack_hits_as_hard_as_its_parts():
+    parts = [_packet(a, race="Orc", unit_class="Cavalry") for a in (3.0, 8.5, 1.25)]
+    separate = sum(ct.attack_damage(p, ct.DEF_UNIT) for p in parts)
+    merged = combat_engine.merge_stacks([dict(p) for p in parts])
+    assert len(merged) == 1
+    assert abs(ct.attack_damage(merged[0], ct.DEF_UNIT) - separate) < 1e-9
+
+
+def test_absorb_damage_is_proportional():
+    stacks = [_packet(30), _packet(10)]
+    combat_engine.absorb_damage(stacks, 8)
+    assert [p["amount"] for p in stacks] == [24, 8]
+
+
+def _random_clashes(rng, n):
+    races = [r for r in ct.RACE_NAMES if r != "Neutral"]
+    classes = ct.CLASS_NAMES + ["Hero", "Titan"]
+    clashes = []
+    for _ in range(n):
+        fronts = []
+        for owner, direction in (("alice", 1), ("bob", -1)):
+            front = []
+            for _ in range(rng.randint(1, 3)):
+                p = _packet(rng.uniform(1, 40), owner=owner, race=rng.choice(races), direction=direction,
+                            unit_class=rng.choice(classes))
+                p["atk_bonus"] = rng.uniform(0.5, 2.0)
+                p["current_buff"] = rng.choice((1.0, 1.2))
+                front.append(p)
+            fronts.append(front)
+        clashes.append(tuple(fronts))
+    return clashes
+
+
+@pytest.mark.skipif(ct.np is None, reason="needs numpy")
+def test_batched_clashes_match_scalar_path(monkeypatch):
+    clashes = _random_clashes(random.Random(7), combat_engine.BATCH_CLASH_MIN)
+    assert sum(len(f) + len(r) for f, r in clashes) >= combat_engine.BATCH_CLASH_MIN
+    scalar = [tuple([dict(p) for p in front] for front in clash) for clash in clashes]
+
+    combat_engine.resolve_clashes(clashes, {})
+    monkeypatch.setattr(combat_engine, "BATCH_CLASH_MIN", float("inf"))
+    combat_engine.resolve_clashes(scalar, {})
+
+    batched_amounts = [p["amount"] for clash in clashes for front in clash for p in front]
+    scalar_amounts = [p["amount"] for clash in scalar for front in clash for p in front]
+    assert batched_amounts == scalar_amounts
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+import combat_engine
+import fortress_engine
+
+
+def test_dense_pass_matches_sparse_scan(game_state):
+    pytest.importorskip("numpy")
+    rng = random.Random(5)
+    # Enough owned vertices, with some whole faces, that the vectorised pass is taken
+    for f_idx in rng.sample(range(len(game_state["faces"])), 30):
+        owner = rng.choice(("alice", "bob"))
+        for vid in game_state["faces"][f_idx]:
+            fortress_engine.set_fortress_owner(game_state, vid, owner)
+            game_state["fortresses"].materialize(str(vid))['tier'] = rng.randint(1, 3)
+    owned = sum(len(fids) for fids in game_state["owner_index"].values())
+    assert owned >= len(game_state["faces"]) * combat_engine.DENSE_OWNED_PER_FACE
+
+    dense = combat_engine.dominated_faces(game_state)
+    assert dense
+    assert dense == combat_engine._dominated_faces_sparse(game_state)
+    assert game_state["dominance_columns"]["faces_ref"] is game_state["faces"]
+
+
+def test_sector_owners_only_lists_held_faces(game_state):
+    import simulation_engine
+
+    assert game_state["sector_owners"] == {}
+    simulation_engine.join_player(game_state, "alice")
+    combat_engine.process_sector_dominance(game_state)
+    held = {f_idx for f_idx, owner in game_state["sector_owners"].items() if owner == "alice"}
+    assert held
+    assert len(game_state["sector_owners"]) < len(game_state["faces"])
+
+    for fid in list(game_state["owner_index"]["alice"]):
+        fortress_engine.set_fortress_owner(game_state, fid, None)
+    combat_engine.process_sector_dominance(game_state)
+    # Lost faces stay listed as None so checkpoints and clients clear them
+    assert all(game_state["sector_owners"][f] is None for f in held)
@@ -0,0 +1,89 @@
+import random
+
+import mongomock
+import pytest
+
+import event_log
+import persistence_engine
+import simulation_engine
+import world_engine
+
+COMPARED_KEYS = ("edges", "sector_owners", "face_colors", "tick")
+
+
+def _record_match(tmp_path, db, play, ticks=30):
+    log = event_log.EventLog(log_dir=str(tmp_path))
+    game_state = {}
+    seed = simulation_engine.new_match(game_state, seed=4242)
+    log.start_match(game_state["match_id"], seed)
+    for username in ("alice", "bob"):
+        simulation_engine.join_player(game_state, username)
+        log.record(event_log.EV_JOIN, username=username)
+
+    def on_move(username, source, target):
+        log.record(event_log.EV_MOVE, username=username, source=source, target=target)
+
+    def on_tick(game_state):
+        log.record(event_log.EV_TICK, tick=game_state["tick"])
+        if persistence_engine.maybe_checkpoint(game_state):
+            log.record(event_log.EV_CHECKPOINT, tick=game_state["tick"])
+        persistence_engine.flush(db)
+
+    play(game_state, ticks, random.Random(3), on_move, on_tick)
+    log.flush()
+    events, _ = event_log.read_events(event_log.log_path(game_state["match_id"], str(tmp_path)))
+    return game_state, events
+
+
+def test_full_replay_matches_live(tmp_path, play):
+    db = mongomock.MongoClient().db
+    persistence_engine.flush(db)
+    live, events = _record_match(tmp_path, db, play)
+    replayed = event_log.replay({}, events)
+    assert replayed["fortresses"].stored() == live["fortresses"].stored()
+    for key in COMPARED_KEYS:
+        assert replayed[key] == live[key], key
+    assert replayed["rng"].getstate() == live["rng"].getstate()
+
+
+def test_checkpoint_plus_tail_matches_live(tmp_path, monkeypatch, play):
+    monkeypatch.setattr(persistence_engine, "CHECKPOINT_INTERVAL_TICKS", 7)
+    db = mongomock.MongoClient().db
+    persistence_engine.flush(db)
+    live, events = _record_match(tmp_path, db, play)
+
+    restored = dict(persistence_engine.restore_match(db))
+    simulation_engine.rebuild_state_indexes(restored)
+    tail = event_log.events_after_checkpoint(events, restored["tick"])
+    assert tail, "the match should run past its last checkpoint"
+    event_log.replay(restored, tail)
+    assert restored["fortresses"].stored() == live["fortresses"].stored()
+    for key in COMPARED_KEYS:
+        assert restored[key] == live[key], key
+
+
+def test_tick_divergence_is_reported(tmp_path, play):
+    db = mongomock.MongoClient().db
+    _, events = _record_match(tmp_path, db, play, ticks=3)
+    tampered = [(t, dict(f, tick=f["tick"] + 1) if t == event_log.EV_TICK else f) for t, f in events]
+    with pytest.raises(event_log.ReplayDivergence):
+        event_log.replay({}, tampered)
+
+
+def test_other_world_generator_is_refused(tmp_path, play):
+    db = mongomock.MongoClient().db
+    _, events = _record_match(tmp_path, db, play, ticks=1)
+    ev_type, fields = events[0]
+    assert fields["worldgen"] == world_engine.WORLDGEN_VERSION
+    older = [(ev_type, dict(fields, worldgen=world_engine.WORLDGEN_VERSION - 1))] + events[1:]
+    with pytest.raises(event_log.ReplayDivergence):
+        event_log.replay({}, older)
+
+
+def test_matches_never_create_sanctuaries(tmp_path, play):
+    # Sanctuary spawns never ran in the baseline; new matches and replays must keep it that way
+    db = mongomock.MongoClient().db
+    live, events = _record_match(tmp_path, db, play, ticks=5)
+    assert "sanctuaries" not in live
+    assert "sanctuaries" not in event_log.replay({}, events)
+    assert "sanctuaries" not in persistence_engine.restore_match(db)
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+import fortress_engine
+import simulation_engine
+
+
+def _match(storage):
+    game_state = {}
+    simulation_engine.new_match(game_state, seed=777)
+    game_state["fortresses"] = fortress_engine.initialize_fortresses(game_state, storage)
+    simulation_engine.rebuild_state_indexes(game_state)
+    return game_state
+
+
+def _join(game_state):
+    for username in ("alice", "bob"):
+        simulation_engine.join_player(game_state, username)
+    return game_state
+
+
+def test_sparse_and_eager_storage_play_identically(play):
+    eager, sparse = _match("eager"), _match("sparse")
+    assert len(eager["fortresses"].stored()) == len(eager["vertices"])
+    assert len(sparse["fortresses"].stored()) < len(sparse["vertices"])
+    play(_join(eager), 40, random.Random(11))
+    play(_join(sparse), 40, random.Random(11))
+
+    for vid in range(len(eager["vertices"])):
+        assert sparse["fortresses"].peek(str(vid)) == eager["fortresses"].stored()[str(vid)]
+    for key in ("edges", "sector_owners", "face_colors", "owner_index", "tick"):
+        assert sparse[key] == eager[key], key
+    assert sparse["rng"].getstate() == eager["rng"].getstate()
+    assert sparse["spawn_index"]["faces"] == eager["spawn_index"]["faces"]
+
+
+def test_peek_does_not_store():
+    fortresses = _match("sparse")["fortresses"]
+    fid = next(str(v) for v in range(len(fortresses.vertex_faces)) if str(v) not in fortresses.stored())
+    assert fortresses.has(fid)
+    derived = fortresses.peek(fid)
+    assert fortresses.owner(fid) is None
+    assert fid not in fortresses.stored()
+
+    assert fortresses.materialize(fid) == derived
+    assert fortresses.stored()[fid] is fortresses.materialize(fid)
+    assert fortresses.peek(fid) is fortresses.stored()[fid]
+
+
+def test_only_vertex_ids_are_fortresses():
+    fortresses = _match("sparse")["fortresses"]
+    last = len(fortresses.vertex_faces) - 1
+    assert fortresses.has(str(last))
+    for fid in (str(last + 1), "007", "-1", 7):
+        assert not fortresses.has(fid)
+        with pytest.raises(KeyError):
+            fortresses.peek(fid)
+
+
+def test_garrison_columns_match_derived_fortresses():
+    fortresses = _match("sparse")["fortresses"]
+    columns = fortresses.garrison_columns()
+    for vid in range(len(fortresses.vertex_faces)):
+        fort = fortresses.peek(str(vid))
+        if fort['owner'] is None and str(vid) not in fortresses.stored():
+            assert fortress_engine.FORTRESS_TYPE_NAMES[columns["types"][vid]] == fort['type']
+            assert columns["units"][vid] == fort['units']
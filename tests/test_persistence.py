@@ -0,0 +1,143 @@
+import random
+
+import mongomock
+import pytest
+
+import persistence_engine
+import simulation_engine
+
+COMPARED_KEYS = ("edges", "sector_owners", "face_colors", "face_terrain", "tick", "match_id", "seed")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # Small intervals so a short match writes a full snapshot followed by incrementals
+    monkeypatch.setattr(persistence_engine, "CHECKPOINT_INTERVAL_TICKS", 2)
+    monkeypatch.setattr(persistence_engine, "FULL_SNAPSHOT_EVERY_CHECKPOINTS", 4)
+    persistence_engine.flush(mongomock.MongoClient().db)
+    return mongomock.MongoClient().db
+
+
+def _checkpointer(db, kinds):
+    """on_tick callback that checkpoints and flushes, noting whether each checkpoint was full."""
+    def on_tick(game_state):
+        if persistence_engine.maybe_checkpoint(game_state):
+            kinds.append(game_state["checkpoints_since_full"] == 0)
+        persistence_engine.flush(db)
+    return on_tick
+
+
+def _restore(db):
+    restored = persistence_engine.restore_match(db)
+    assert restored is not None
+    game_state = dict(restored)
+    simulation_engine.rebuild_state_indexes(game_state)
+    return game_state
+
+
+def _assert_same(live, restored):
+    assert restored["fortresses"].stored() == live["fortresses"].stored()
+    for key in COMPARED_KEYS:
+        assert restored[key] == live[key], key
+    assert restored["rng"].getstate() == live["rng"].getstate()
+    assert restored["owner_index"] == live["owner_index"]
+    assert restored["spawn_index"]["faces"] == live["spawn_index"]["faces"]
+
+
+def test_full_then_incremental_round_trip(game_state, db, play):
+    simulation_engine.join_player(game_state, "alice")
+    simulation_engine.join_player(game_state, "bob")
+    moves = random.Random(9)
+    # Ends on an incremental checkpoint: full at tick 1, incrementals at 2, 4, 6, full at 8, ...
+    kinds = []
+    play(game_state, 12, moves, on_tick=_checkpointer(db, kinds))
+    assert kinds[0] is True and kinds[-1] is False
+    assert True in kinds[1:]
+
+    restored = _restore(db)
+    _assert_same(game_state, restored)
+
+    # Both copies keep evolving identically from the checkpoint
+    for state in (game_state, restored):
+        for _ in range(5):
+            simulation_engine.run_tick(state)
+    assert restored["fortresses"].stored() == game_state["fortresses"].stored()
+    for key in ("edges", "sector_owners", "face_colors", "tick"):
+        assert restored[key] == game_state[key], key
+
+
+def test_restore_without_checkpoint_returns_none(db):
+    assert persistence_engine.restore_match(db) is None
+
+
+def test_checkpoint_from_other_world_generator_is_not_restored(game_state, db):
+    simulation_engine.join_player(game_state, "alice")
+    persistence_engine.maybe_checkpoint(game_state)
+    persistence_engine.flush(db)
+    db.match_meta.update_one({"_id": persistence_engine.META_ID}, {"$set": {"worldgen": 2}})
+    assert persistence_engine.restore_match(db) is None
+
+
+class FailingDb:
+    """Passes everything through to db except bulk document writes, which fail."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+        if name.startswith("match_") and name != "match_meta":
+            collection = FailingCollection(collection)
+        return collection
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class FailingCollection:
+    def __init__(self, inner):
+        self.inner = inner
+
+    def bulk_write(self, *args, **kwargs):
+        raise RuntimeError("disk full")
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def test_half_written_checkpoint_is_not_restored(game_state, db):
+    simulation_engine.join_player(game_state, "alice")
+    persistence_engine.maybe_checkpoint(game_state)
+    persistence_engine.flush(db)
+    assert persistence_engine.restore_match(db) is not None
+
+    simulation_engine.run_tick(game_state)
+    game_state["checkpoints_since_full"] = None
+    persistence_engine.maybe_checkpoint(game_state)
+    with pytest.raises(RuntimeError):
+        persistence_engine.flush(FailingDb(db))
+    assert persistence_engine.restore_match(db) is None
+
+
+def test_failed_write_forces_next_checkpoint_full(game_state, db, monkeypatch):
+    monkeypatch.setattr(persistence_engine, "_needs_full", False)
+    simulation_engine.join_player(game_state, "alice")
+    persistence_engine.maybe_checkpoint(game_state)
+    persistence_engine.flush(db)
+
+    simulation_engine.run_tick(game_state)
+    persistence_engine.write_queued(FailingDb(db), persistence_engine.build_checkpoint(game_state))
+    assert persistence_engine._needs_full
+
+    # Incrementals would miss the failed batch's keys, so they are dropped
+    simulation_engine.run_tick(game_state)
+    persistence_engine.write_queued(db, persistence_engine.build_checkpoint(game_state))
+    assert persistence_engine.restore_match(db) is None
+
+    simulation_engine.run_tick(game_state)
+    game_state["tick"] = persistence_engine.CHECKPOINT_INTERVAL_TICKS * 10
+    assert persistence_engine.maybe_checkpoint(game_state)
+    assert game_state["checkpoints_since_full"] == 0
+    persistence_engine.write_queued(db, persistence_engine._write_queue.get_nowait())
+    assert not persistence_engine._needs_full
+    _assert_same(game_state, _restore(db))
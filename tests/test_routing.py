@@ -0,0 +1,70 @@
+import routing_engine
+import simulation_engine
+
+
+def _claimed(game_state, username="alice"):
+    simulation_engine.join_player(game_state, username)
+    owned = sorted(game_state["owner_index"][username], key=int)
+    return game_state["fortresses"].materialize(owned[0])
+
+
+def test_path_tree_costs_match_routes(game_state):
+    fort = _claimed(game_state)
+    tree = routing_engine.get_path_tree(game_state, fort['id'], "alice")
+    assert tree["dist"][int(fort['id'])] == 0.0
+    for v, d in tree["dist"].items():
+        route = routing_engine.find_route(game_state, fort['id'], v, "alice")
+        if route is None:
+            continue
+        cost = sum(routing_engine.get_vertex_cost(game_state["fortresses"].peek(str(u)), "alice") for u in route[1:])
+        assert abs(cost - d) < 1e-9
+        assert tree["first_hop"][v] == route[1]
+
+
+def test_path_tree_is_cached_until_invalidated(game_state):
+    fort = _claimed(game_state)
+    tree = routing_engine.get_path_tree(game_state, fort['id'], "alice")
+    assert routing_engine.get_path_tree(game_state, fort['id'], "alice") is tree
+    routing_engine.invalidate_routes(game_state)
+    assert routing_engine.get_path_tree(game_state, fort['id'], "alice") is not tree
+
+
+def test_nearest_target_is_cheapest_unowned(game_state):
+    fort = _claimed(game_state)
+    tree = routing_engine.get_path_tree(game_state, fort['id'], "alice")
+    target = routing_engine.nearest_target(game_state, fort['id'], "alice")
+    fortresses = game_state["fortresses"]
+    assert fortresses.owner(str(target)) != "alice"
+    unowned = [d for v, d in tree["dist"].items() if fortresses.owner(str(v)) != "alice"]
+    assert tree["dist"][target] == min(unowned)
+
+
+def test_adjacent_target_stays_direct(game_state):
+    fort = _claimed(game_state)
+    fort['tier'] = 3
+    neighbor = next(v for v in game_state["adj"][int(fort['id'])] if game_state["fortresses"].owner(str(v)) != "alice")
+    fort['paths'].append(str(neighbor))
+    assert not routing_engine.add_route(game_state, fort, neighbor)
+    assert fort['paths'] == [str(neighbor)]
+    assert fort.get('routes', {}) == {}
+
+    assert routing_engine.toggle_route(game_state, fort, neighbor)
+    assert fort['paths'] == []
+    assert routing_engine.toggle_route(game_state, fort, neighbor)
+    assert fort['paths'] == [str(neighbor)]
+    assert fort.get('routes', {}) == {}
+
+
+def test_distant_target_gets_route_entry(game_state):
+    fort = _claimed(game_state)
+    fort['tier'] = 3
+    tree = routing_engine.get_path_tree(game_state, fort['id'], "alice")
+    adjacent = set(game_state["adj"][int(fort['id'])])
+    far = next(v for v in sorted(tree["dist"], key=tree["dist"].get)
+               if v != int(fort['id']) and v not in adjacent and tree["first_hop"][v] is not None)
+    assert routing_engine.toggle_route(game_state, fort, far)
+    first = str(tree["first_hop"][far])
+    assert fort['paths'] == [first]
+    assert fort['routes'] == {first: str(far)}
+    assert routing_engine.toggle_route(game_state, fort, far)
+    assert fort['paths'] == [] and fort['routes'] == {}
@@ -0,0 +1,52 @@
+import fortress_engine
+from config import SPAWN_EXCLUDED_TERRAINS
+
+
+def _check_consistent(game_state):
+    spawn_index = game_state["spawn_index"]
+    faces = spawn_index["faces"]
+    assert len(faces) == len(set(faces)) == len(spawn_index["pos"])
+    for pos, f_idx in enumerate(faces):
+        assert spawn_index["pos"][f_idx] == pos
+    expected = {f for f in range(len(game_state["faces"])) if fortress_engine._is_spawn_face(game_state, f)}
+    assert set(faces) == expected
+
+
+def test_index_covers_free_land_faces(game_state):
+    _check_consistent(game_state)
+    for f_idx in game_state["spawn_index"]["faces"]:
+        assert game_state["face_terrain"][f_idx] not in SPAWN_EXCLUDED_TERRAINS
+
+
+def test_swap_remove_keeps_positions():
+    spawn_index = {"faces": [], "pos": {}}
+    for f_idx in (4, 7, 9, 12):
+        fortress_engine._add_spawn_face(spawn_index, f_idx)
+    fortress_engine._remove_spawn_face(spawn_index, 7)
+    assert spawn_index["faces"] == [4, 12, 9]
+    assert spawn_index["pos"] == {4: 0, 12: 1, 9: 2}
+    fortress_engine._remove_spawn_face(spawn_index, 9)
+    assert spawn_index["faces"] == [4, 12]
+    assert spawn_index["pos"] == {4: 0, 12: 1}
+    fortress_engine._remove_spawn_face(spawn_index, 99)
+    assert spawn_index["faces"] == [4, 12]
+
+
+def test_ownership_changes_update_index(game_state):
+    face = game_state["spawn_index"]["faces"][0]
+    vid = game_state["faces"][face][0]
+    fortress_engine.set_fortress_owner(game_state, vid, "alice")
+    assert face not in game_state["spawn_index"]["pos"]
+    _check_consistent(game_state)
+    fortress_engine.set_fortress_owner(game_state, vid, None)
+    assert face in game_state["spawn_index"]["pos"]
+    _check_consistent(game_state)
+
+
+def test_sample_skips_excluded_terrain(game_state):
+    terrains = {game_state["face_terrain"][f] for f in game_state["spawn_index"]["faces"]}
+    keep = sorted(terrains)[0]
+    excluded = tuple(t for t in terrains if t != keep)
+    for _ in range(20):
+        f_idx = fortress_engine.sample_spawn_face(game_state, excluded)
+        assert game_state["face_terrain"][f_idx] == keep
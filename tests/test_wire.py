@@ -0,0 +1,68 @@
+import os
+import re
+
+import msgpack
+import pytest
+
+import fortress_engine
+import simulation_engine
+import wire_engine
+
+CLIENT_JS = os.path.join(os.path.dirname(__file__), "..", "static", "js", "game_client.js")
+
+
+@pytest.fixture
+def msgpack_wire(monkeypatch):
+    monkeypatch.setattr(wire_engine, "WIRE_FORMAT", "msgpack")
+
+
+def _client_fields():
+    """WIRE_FIELDS as written out by hand in game_client.js."""
+    with open(CLIENT_JS) as f:
+        source = f.read()
+    block = re.search(r"const WIRE_FIELDS = \{(.*?)\};", source, re.S).group(1)
+    return {event: tuple(re.findall(r"'(\w+)'", names))
+            for event, names in re.findall(r"(\w+): \[(.*?)\]", block, re.S)}
+
+
+def test_event_fields_order_is_pinned():
+    assert wire_engine.EVENT_FIELDS == {
+        "fortress_frame": ("tick", "ids", "owners", "units", "tiers", "types", "path_counts", "path_targets",
+                           "owner_names", "tick_frame", "sent_at"),
+        "face_deltas": ("deltas", "owner_names"),
+    }
+
+
+def test_client_mirrors_event_fields():
+    assert _client_fields() == wire_engine.EVENT_FIELDS
+
+
+def test_fortress_frame_round_trip(game_state, msgpack_wire):
+    simulation_engine.join_player(game_state, "alice")
+    fid = min(fortress_engine.get_owned_fortress_ids(game_state, "alice"), key=int)
+    target = str(game_state["adj"][int(fid)][0])
+    simulation_engine.apply_move(game_state, "alice", fid, target)
+    frame = fortress_engine.pop_fortress_frame(game_state)
+    frame.update(tick_frame=True, sent_at=1234.5)
+    assert frame["owner_names"] and all(isinstance(oid, str) for oid in frame["owner_names"])
+
+    data = wire_engine.encode("fortress_frame", frame)
+    row = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    assert row == [frame[field] if field != "owner_names" else {int(k): v for k, v in frame[field].items()}
+                   for field in wire_engine.EVENT_FIELDS["fortress_frame"]]
+    assert all(isinstance(oid, int) for oid in row[wire_engine.EVENT_FIELDS["fortress_frame"].index("owner_names")])
+    assert wire_engine.decode("fortress_frame", data) == frame
+
+
+def test_face_deltas_round_trip(msgpack_wire):
+    payload = {"deltas": [0, 255, 1, 7, 16711680, 2, 9, 0, 0], "owner_names": {"1": "alice", "2": "bob"}}
+    data = wire_engine.encode("face_deltas", payload)
+    assert msgpack.unpackb(data, raw=False, strict_map_key=False) == [payload["deltas"], {1: "alice", 2: "bob"}]
+    assert wire_engine.decode("face_deltas", data) == payload
+
+
+def test_json_format_passes_payload_through(monkeypatch):
+    monkeypatch.setattr(wire_engine, "WIRE_FORMAT", "json")
+    payload = {"deltas": [], "owner_names": {}}
+    assert wire_engine.encode("face_deltas", payload) is payload
+    assert wire_engine.decode("face_deltas", payload) is payload
@@ -0,0 +1,39 @@
+import random
+from collections import Counter
+
+import world_engine
+from config import ICO_SUBDIVISIONS
+
+SEEDS = range(40)
+
+
+def _mean_terrain(subdivisions=ICO_SUBDIVISIONS):
+    total = Counter()
+    for seed in SEEDS:
+        total.update(world_engine.generate_game_world(random.Random(seed), subdivisions)["face_terrain"])
+    return {terrain: count / len(SEEDS) for terrain, count in total.items()}
+
+
+def test_default_size_keeps_every_feature():
+    # The coin-flip generator averaged about 26 Mountain faces out of 320
+    terrain = _mean_terrain()
+    assert 15 <= terrain.get("Mountain", 0) <= 40
+    assert 4 <= terrain.get("Lava", 0) <= 20
+    assert 2 <= terrain.get("Hill", 0) <= 20
+    assert terrain.get("Plain", 0) >= 100
+    assert 60 <= terrain.get("Deep Sea", 0) + terrain.get("Sea", 0) <= 180
+
+
+def test_feature_share_holds_on_larger_spheres():
+    small = _mean_terrain()
+    large = Counter(world_engine.generate_game_world(random.Random(1), ICO_SUBDIVISIONS + 2)["face_terrain"])
+    for feature in ("Mountain", "Lava"):
+        small_share = small[feature] / (20 * 4 ** ICO_SUBDIVISIONS)
+        large_share = large[feature] / (20 * 4 ** (ICO_SUBDIVISIONS + 2))
+        assert 0.5 * small_share <= large_share <= 2.0 * small_share, feature
+
+
+def test_generation_is_deterministic_per_seed():
+    a = world_engine.generate_game_world(random.Random(7))
+    b = world_engine.generate_game_world(random.Random(7))
+    assert a["face_terrain"] == b["face_terrain"]
@@ -0,0 +1,43 @@
+"""
+Valhalla Wire Engine: encodes the per-tick broadcast events once per tick.
+
+With WIRE_FORMAT = 'msgpack' each event becomes one MessagePack array in the field
+order of EVENT_FIELDS, with integer owner-id keys, and Socket.IO ships it as a
+binary attachment. With 'json' the payload dicts pass through untouched.
+static/js/game_client.js mirrors EVENT_FIELDS to decode.
+"""
+from config import WIRE_FORMAT
+
+EVENT_FIELDS = {
+    "fortress_frame": ("tick", "ids", "owners", "units", "tiers", "types", "path_counts", "path_targets", "owner_names",
+                       "tick_frame", "sent_at"),
+    "face_deltas": ("deltas", "owner_names"),
+}
+
+
+def encode(event, payload):
+    """Returns what to pass to emit(): the dict itself, or msgpack bytes."""
+    if WIRE_FORMAT != "msgpack":
+        return payload
+    import msgpack
+
+    row = []
+    for field in EVENT_FIELDS[event]:
+        value = payload[field]
+        if field == "owner_names":
+            value = {int(oid): name for oid, name in value.items()}
+        row.append(value)
+    return msgpack.packb(row, use_bin_type=True)
+
+
+def decode(event, data):
+    """Inverse of encode for Python consumers (load_test.py)."""
+    if not isinstance(data, (bytes, bytearray)):
+        return data
+    import msgpack
+
+    row = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    payload = dict(zip(EVENT_FIELDS[event], row))
+    if "owner_names" in payload:
+        payload["owner_names"] = {str(oid): name for oid, name in payload["owner_names"].items()}
+    return payload
@@ -1,10 +1,13 @@
 import math
 import random
+import time
 from collections import deque
 from config import (
     ICO_SUBDIVISIONS, SURFACE_OCEANS, MIN_SURFACE_DEEP_SEA_PERCENT,
     MAX_SURFACE_DEEP_SEA_PERCENT, SPAWN_CHANCE_WASTE, SPAWN_CHANCE_FARM,
-    MOUNTAIN_RANGE_MIN_LENGTH, MOUNTAIN_RANGE_MAX_LENGTH, TERRAIN_COLORS
+    MOUNTAIN_RANGE_MIN_LENGTH, MOUNTAIN_RANGE_MAX_LENGTH, TERRAIN_COLORS,
+    NUM_MOUNTAIN_RANGES, LAVA_RIVERS, NUM_LAVA_RIVERS, LAVA_RIVERS_MIN_LENGTH,
+    LAVA_RIVERS_MAX_LENGTH
 )
 
 def darken_color(hex_color, factor=0.4):
@@ -36,23 +39,193 @@ def create_ico_sphere(subdivisions):
         if l>0: vertices[i] = [c/l for c in vertices[i]]
     return vertices, faces
 
-def generate_game_world():
-    vertices, faces = create_ico_sphere(ICO_SUBDIVISIONS)
-    adj = {i: set() for i in range(len(vertices))}
-    roads = set()
-    edge_to_faces = {}
-    
+# Bumped whenever the same seed would produce a different world; event logs record it.
+# 2: staged terrain. 3: neutral garrisons derived per vertex (fortress_engine.FortressMap).
+WORLDGEN_VERSION = 3
+WATER_TERRAINS = ("Deep Sea", "Sea")
+HILL_FLANK_CHANCE = 0.5  # Chance a plain next to a mountain range becomes a hill
+
+def build_edge_faces(faces):
+    """Maps each sorted vertex pair to the faces sharing that edge."""
+    edge_faces = {}
     for idx, face in enumerate(faces):
         for e in [tuple(sorted((face[0],face[1]))), tuple(sorted((face[1],face[2]))), tuple(sorted((face[2],face[0])))]:
-            if e not in edge_to_faces: edge_to_faces[e] = []
-            edge_to_faces[e].append(idx)
-            
+            if e not in edge_faces: edge_faces[e] = []
+            edge_faces[e].append(idx)
+    return edge_faces
+
+def build_face_neighbors(num_faces, edge_faces):
+    """Per-face list of the (three) faces sharing an edge with it, in edge-map order."""
+    neighbors = [[] for _ in range(num_faces)]
+    for f_idxs in edge_faces.values():
+        if len(f_idxs) == 2:
+            a, b = f_idxs
+            neighbors[a].append(b)
+            neighbors[b].append(a)
+    return neighbors
+
+def grow_oceans(face_terrain, face_neighbors, rng, num_oceans, target_faces):
+    """Multi-source BFS flood fill from num_oceans random seeds until target_faces are Deep Sea."""
+    num_faces = len(face_terrain)
+    seeds = rng.sample(range(num_faces), min(num_oceans, num_faces))
+    frontier = deque()
+    filled = 0
+    for f in seeds:
+        face_terrain[f] = "Deep Sea"
+        frontier.append(f)
+        filled += 1
+    while frontier and filled < target_faces:
+        f = frontier.popleft()
+        order = face_neighbors[f][:]
+        rng.shuffle(order)
+        for n in order:
+            if face_terrain[n] == "Deep Sea":
+                continue
+            # Leaving some faces to a later pass keeps coastlines ragged instead of hexagonal
+            if rng.random() < 0.35:
+                frontier.append(f)
+                break
+            face_terrain[n] = "Deep Sea"
+            frontier.append(n)
+            filled += 1
+            if filled >= target_faces:
+                break
+
+def carve_coasts(face_terrain, face_neighbors):
+    """Land faces touching Deep Sea become shallow Sea."""
+    coast = [f for f, t in enumerate(face_terrain)
+             if t != "Deep Sea" and any(face_terrain[n] == "Deep Sea" for n in face_neighbors[f])]
+    for f in coast:
+        face_terrain[f] = "Sea"
+
+def pick_face(rng, candidates, accept, tries=64):
+    """Rejection-samples a face from a precomputed candidate list instead of rescanning the map."""
+    if not candidates:
+        return None
+    for _ in range(tries):
+        f = rng.choice(candidates)
+        if accept(f):
+            return f
+    return None
+
+def random_walk(face_terrain, face_neighbors, rng, start, length, terrain, passable):
+    """Paints terrain along a non-revisiting walk over face adjacency. Returns the faces painted.
+    Steps avoid faces touching the face two steps back, so walks run on instead of curling up."""
+    path = [start]
+    face_terrain[start] = terrain
+    visited = {start}
+    current = start
+    while len(path) < length:
+        options = [n for n in face_neighbors[current] if n not in visited and face_terrain[n] in passable]
+        if not options:
+            break
+        if len(path) > 1:
+            behind = face_neighbors[path[-2]]
+            onward = [n for n in options if n not in behind]
+            if onward:
+                options = onward
+        current = rng.choice(options)
+        visited.add(current)
+        face_terrain[current] = terrain
+        path.append(current)
+    return path
+
+def raise_mountains(face_terrain, face_neighbors, rng, num_ranges, min_len, max_len):
+    land = [f for f, t in enumerate(face_terrain) if t == "Plain"]
+    for _ in range(num_ranges):
+        start = pick_face(rng, land, lambda f: face_terrain[f] == "Plain")
+        if start is None:
+            return
+        ridge = random_walk(face_terrain, face_neighbors, rng, start,
+                            rng.randint(min_len, max_len), "Mountain", ("Plain", "Hill"))
+        for f in ridge:
+            for n in face_neighbors[f]:
+                if face_terrain[n] == "Plain" and rng.random() < HILL_FLANK_CHANCE:
+                    face_terrain[n] = "Hill"
+
+def pour_lava(face_terrain, face_neighbors, rng, num_rivers, min_len, max_len):
+    """Rivers rise beside a mountain where there is one and run over dry land until blocked."""
+    dry = ("Plain", "Hill")
+    foothills = [f for f, t in enumerate(face_terrain) if t in dry
+                 and any(face_terrain[n] == "Mountain" for n in face_neighbors[f])]
+    land = [f for f, t in enumerate(face_terrain) if t in dry]
+    for _ in range(num_rivers):
+        start = pick_face(rng, foothills or land, lambda f: face_terrain[f] in dry)
+        if start is None:
+            return
+        random_walk(face_terrain, face_neighbors, rng, start, rng.randint(min_len, max_len), "Lava", dry)
+
+def scatter_biomes(face_terrain, rng):
+    for f, t in enumerate(face_terrain):
+        if t != "Plain":
+            continue
+        roll = rng.random()
+        if roll < SPAWN_CHANCE_WASTE:
+            face_terrain[f] = "Waste"
+        elif roll < SPAWN_CHANCE_WASTE + SPAWN_CHANCE_FARM:
+            face_terrain[f] = "Farm"
+
+def generate_terrain(faces, edge_faces, rng, subdivisions=ICO_SUBDIVISIONS, timings=None):
+    """Oceans, coasts, mountain ranges, lava rivers, then scattered biomes.
+    Range and river counts are tuned for ICO_SUBDIVISIONS and multiply with surface area on
+    larger spheres; their lengths are in faces and stay fixed, so coverage keeps its share."""
+    clock = time.perf_counter
+    started = clock()
     num_faces = len(faces)
+    face_neighbors = build_face_neighbors(num_faces, edge_faces)
+    area = 4 ** max(0, subdivisions - ICO_SUBDIVISIONS)
     face_terrain = ["Plain"] * num_faces
-    # Simplistic biome gen for demo purposes
-    for i in range(num_faces):
-        if random.random() < 0.2: face_terrain[i] = "Deep Sea"
-        elif random.random() < 0.1: face_terrain[i] = "Mountain"
+    stages = [("face_neighbors", clock())]
+
+    deep_fraction = rng.uniform(MIN_SURFACE_DEEP_SEA_PERCENT, MAX_SURFACE_DEEP_SEA_PERCENT)
+    grow_oceans(face_terrain, face_neighbors, rng, SURFACE_OCEANS, int(num_faces * deep_fraction))
+    carve_coasts(face_terrain, face_neighbors)
+    stages.append(("oceans", clock()))
+
+    raise_mountains(face_terrain, face_neighbors, rng, NUM_MOUNTAIN_RANGES * area,
+                    MOUNTAIN_RANGE_MIN_LENGTH, MOUNTAIN_RANGE_MAX_LENGTH)
+    stages.append(("mountains", clock()))
+
+    if LAVA_RIVERS:
+        pour_lava(face_terrain, face_neighbors, rng, NUM_LAVA_RIVERS * area,
+                  LAVA_RIVERS_MIN_LENGTH, LAVA_RIVERS_MAX_LENGTH)
+    stages.append(("lava", clock()))
+
+    scatter_biomes(face_terrain, rng)
+    stages.append(("biomes", clock()))
+
+    if timings is not None:
+        previous = started
+        for name, at in stages:
+            timings[name] = at - previous
+            previous = at
+    return face_terrain
+
+def generate_game_world(rng=random, subdivisions=ICO_SUBDIVISIONS, timings=None):
+    """Builds a world from rng. timings, if given, receives seconds per pipeline stage."""
+    clock = time.perf_counter
+    started = clock()
+    vertices, faces = create_ico_sphere(subdivisions)
+    sphere_done = clock()
+    edge_faces = build_edge_faces(faces)
+    edges_done = clock()
+    face_terrain = generate_terrain(faces, edge_faces, rng, subdivisions, timings)
+    terrain_done = clock()
+    world = build_world_from_terrain(vertices, faces, face_terrain, edge_faces)
+    world["worldgen"] = WORLDGEN_VERSION
+
+    if timings is not None:
+        timings["ico_sphere"] = sphere_done - started
+        timings["edge_faces"] = edges_done - sphere_done
+        timings["terrain_total"] = terrain_done - edges_done
+        timings["roads"] = clock() - terrain_done
+    return world
+
+def build_world_from_terrain(vertices, faces, face_terrain, edge_to_faces=None):
+    """Derives roads, adjacency and empty edge state from a finished terrain map."""
+    adj = {i: set() for i in range(len(vertices))}
+    if edge_to_faces is None:
+        edge_to_faces = build_edge_faces(faces)
 
     valid_roads = set()
     for e, f_idxs in edge_to_faces.items():
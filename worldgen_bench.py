@@ -0,0 +1,60 @@
+"""
+Per-stage timings of world generation.
+
+    python worldgen_bench.py
+    python worldgen_bench.py --subdivisions 4 5 6 --seed 7 --repeat 3
+
+Runs the same pipeline as simulation_engine.new_match without Flask, MongoDB
+or an event log, and prints the best time of each stage per sphere size.
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from config import FORTRESS_STORAGE
+import fortress_engine
+import world_engine
+
+
+def run_once(seed, subdivisions, storage):
+    timings = {}
+    began = time.perf_counter()
+    game_state = {"rng": random.Random(seed), "seed": seed}
+    game_state.update(world_engine.generate_game_world(game_state["rng"], subdivisions, timings))
+
+    started = time.perf_counter()
+    game_state["fortresses"] = fortress_engine.initialize_fortresses(game_state, storage)
+    timings["fortresses"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fortress_engine.build_spawn_index(game_state)
+    timings["spawn_index"] = time.perf_counter() - started
+    timings["total"] = time.perf_counter() - began
+    return timings, game_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of Valhalla world generation.")
+    parser.add_argument("--subdivisions", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size; the fastest is reported")
+    parser.add_argument("--storage", choices=("eager", "sparse"), default=FORTRESS_STORAGE, help="Neutral fortress storage")
+    args = parser.parse_args()
+
+    for subdivisions in args.subdivisions:
+        best = {}
+        for _ in range(args.repeat):
+            timings, game_state = run_once(args.seed, subdivisions, args.storage)
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+
+        terrain = Counter(game_state["face_terrain"])
+        print(f"[WORLDGEN] subdivisions={subdivisions}: {len(game_state['faces'])} faces, "
+              f"{len(game_state['vertices'])} vertices, worldgen v{world_engine.WORLDGEN_VERSION}, {args.storage} fortresses")
+        for stage, seconds in best.items():
+            print(f"    {stage:<16}{1000.0 * seconds:10.1f} ms")
+        print(f"    terrain: {dict(terrain.most_common())}")
+
+
+if __name__ == "__main__":
+    main()